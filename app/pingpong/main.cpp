@@ -200,7 +200,6 @@ int main(int argc, char** argv)
     }
     else
     {
-      std::cout << "Running as acceptor, listening on " << address_str << std::endl;
       net::acceptor acceptor{pingponger.get_io_context()};
       acceptor.listen(host, port);
       acceptor.start([&](std::error_code ec, net::socket new_sock) {
@@ -215,6 +214,9 @@ int main(int argc, char** argv)
         pingponger.add_connection(std::move(new_sock), md.msg_size);
       });
 
+      // Printed only once the socket is listening: the scenario runner waits for this line
+      std::cout << "Running as acceptor, listening on " << address_str << std::endl;
+
       if (cpu_affinity >= 0)
       {
         set_thread_cpu_affinity(cpu_affinity);
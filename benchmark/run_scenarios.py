@@ -10,6 +10,7 @@ import argparse
 import dataclasses as dc
 from pathlib import Path
 from typing import List, Optional, Sequence
+import socket
 import sys
 
 # Support running both as a module (`python -m benchmark.run_scenarios`) and as a script
@@ -24,7 +25,7 @@ if __package__ is None or __package__ == "":
 
     REPO_ROOT = _REPO_ROOT
 else:
-    from .runner.constants import RECEIVER_BIN_NAME
+    from .runner.constants import RECEIVER_BIN_NAME, PINGPONG_BIN_NAME
     from .runner.types import FixedParams, Scenario
     from .runner.exec import run_from_args
 
@@ -32,8 +33,6 @@ else:
 
 
 def get_default_ip_address() -> str:
-    import socket
-
     s = None
     try:
         # This is a common trick to get the primary non-loopback IP.
@@ -171,6 +170,18 @@ def main(argv: Optional[Sequence[str]] = None) -> int:
                    help="Extra receiver arg for impl, format impl=token (repeatable). "
                         "Example: --impl-arg uring=--zerocopy --impl-arg uring=true")
     p.add_argument("--dry-run", action="store_true")
+    p.add_argument("--numa-split", action="store_true",
+                   help="With --auto-cpu-ids and a local receiver and client, pin receiver workers to the first "
+                        "NUMA node with CPUs and client senders to the second (memory bound via numactl); fails "
+                        "if the host has fewer than two such nodes")
+    p.add_argument("--offline-siblings", action="store_true",
+                   help="Take the SMT siblings of locally pinned CPUs offline for each run and bring them back "
+                        "afterwards (needs root; CPU 0 is never touched)")
+    p.add_argument("--parallel-variations", "--parallel", dest="parallel_variations", type=int, default=1, metavar="K",
+                   help="Run up to K (impl, value) points of a scenario at once, each on its own port and CPUs "
+                        "(local receiver and client with --auto-cpu-ids only)")
+    p.add_argument("--no-logs", action="store_true",
+                   help="Discard client/initiator stdout instead of writing *.stdout logs (receiver/acceptor logs are kept)")
     # CPU affinity automation: when set, the runner will auto-assign CPUs unless FixedParams overrides are provided
     p.add_argument("--auto-cpu-ids", action="store_true", help="Automatically assign CPU affinity for workers/senders and pingpong processes when not explicitly set in FixedParams")
     # FixedParams overrides
@@ -182,6 +193,9 @@ def main(argv: Optional[Sequence[str]] = None) -> int:
                     "Example: --scenario-fixed vary_workers:senders=2")
     # Auto-plot options
     p.add_argument("--auto-plot", action="store_true", help="Generate plots after each scenario")
+    p.add_argument("--plot-in-background", action="store_true",
+                   help="With --auto-plot, plot each scenario while the next one runs instead of in between "
+                        "(faster, but the plot competes with the benchmark for CPU time and caches)")
     p.add_argument("--plot-relative-to", default="bsd", help="Baseline impl for percentage labels; use 'none' to disable")
     p.add_argument("--plot-no-title", action="store_true", help="Hide the main title text in plots")
     p.add_argument("--plot-out-dir", type=Path, help="Output directory for plots (defaults to results/plots)")
@@ -1,101 +1,262 @@
 from __future__ import annotations
-from typing import List, Optional, Set
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Optional, Set, Tuple
+import atexit
+import functools
+import heapq
+import itertools
 import os
+import re
+import sys
+
+
+_CPULIST_RE = re.compile(r"(\d+)(?:\s*-\s*(\d+))?")
+
+
+def _cpulist_ranges(spec: str) -> Iterator[range]:
+    """Yield one range per item of a cpulist ("8" or "0-3"; reversed ranges allowed)."""
+    for a, b in _CPULIST_RE.findall(spec):
+        start = int(a)
+        end = int(b) if b else start
+        yield range(start, end + 1) if start <= end else range(start, end - 1, -1)
 
 
 def _parse_cpulist_spec(spec: str) -> List[int]:
     """Parse Linux cpulist strings like "0-3,8,10-11" into a list of ints."""
-    out: List[int] = []
-    for part in spec.split(","):
-        p = part.strip()
-        if not p:
-            continue
-        if "-" in p:
-            a, b = p.split("-", 1)
-            start = int(a)
-            end = int(b)
-            if start <= end:
-                out.extend(range(start, end + 1))
-            else:
-                out.extend(range(start, end - 1, -1))
-        else:
-            out.append(int(p))
-    return out
-
-
-def _available_cpus() -> List[int]:
-    """Return the list of CPUs available to the current process (affinity-aware)."""
+    return list(itertools.chain.from_iterable(_cpulist_ranges(spec)))
+
+
+_SYSFS_CPU = "/sys/devices/system/cpu"
+
+
+def _siblings_path(cpu: int) -> str:
+    # Plain f-string: os.path.join re-checks separators on every component
+    return f"{_SYSFS_CPU}/cpu{cpu}/topology/thread_siblings_list"
+
+
+def _read_sysfs(path: str) -> str:
+    """Read a small sysfs attribute with raw os.open/os.read (no Python file object)."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        return os.read(fd, 4096).decode("ascii").strip()
+    finally:
+        os.close(fd)
+
+
+def _write_sysfs(path: str, value: str) -> None:
+    """Write a small sysfs attribute with raw os.open/os.write."""
+    fd = os.open(path, os.O_WRONLY)
+    try:
+        os.write(fd, value.encode("ascii"))
+    finally:
+        os.close(fd)
+
+
+def _read_online_cpus() -> List[int]:
+    """Return the CPUs the kernel reports online, from a single sysfs read."""
+    return _parse_cpulist_spec(_read_sysfs(f"{_SYSFS_CPU}/online"))
+
+
+@functools.lru_cache(maxsize=1)
+def _available_cpus() -> Tuple[int, ...]:
+    """Return the CPUs available to the current process (affinity-aware); cached per process."""
     try:
         if hasattr(os, "sched_getaffinity"):
-            return sorted(int(c) for c in os.sched_getaffinity(0))
+            return tuple(sorted(int(c) for c in os.sched_getaffinity(0)))
+    except Exception:
+        pass
+    try:
+        return tuple(_read_online_cpus())
     except Exception:
         pass
     try:
         n = os.cpu_count() or 1
-        return list(range(n))
+        return tuple(range(n))
     except Exception:
-        return [0]
+        return (0,)
+
+
+@functools.lru_cache(maxsize=1)
+def _sysfs_cpu_ids() -> FrozenSet[int]:
+    """Return the ids of all cpuN directories in sysfs, from one directory scan."""
+    try:
+        with os.scandir(_SYSFS_CPU) as it:
+            return frozenset(int(e.name[3:]) for e in it if e.name.startswith("cpu") and e.name[3:].isdigit())
+    except OSError:
+        return frozenset()
+
+
+_CPUINFO_FIELD_RE = re.compile(r"^(processor|physical id|core id)\s*:\s*(\d+)", re.MULTILINE)
 
 
-def _thread_sibling_groups(avail: Set[int]) -> List[List[int]]:
-    """Build SMT sibling groups from sysfs; each group is a list of CPU ids (primary first)."""
-    groups: List[List[int]] = []
-    seen: Set[int] = set()
-    base = "/sys/devices/system/cpu"
-    for cpu in sorted(avail):
-        if cpu in seen:
+@functools.lru_cache(maxsize=1)
+def _cpuinfo_siblings() -> Optional[Dict[int, Tuple[int, ...]]]:
+    """Map every CPU to its SMT siblings by grouping /proc/cpuinfo on (physical id, core id).
+
+    Only a fallback for when sysfs topology is missing: core id is not unique across dies on
+    some multi-die parts and VMs. Returns None when cpuinfo lacks the topology fields (e.g.
+    on most ARM kernels).
+    """
+    try:
+        with open("/proc/cpuinfo") as f:
+            text = f.read()
+    except OSError:
+        return None
+    cores: Dict[Tuple[int, int], List[int]] = {}
+    for block in text.split("\n\n"):
+        fields = dict(_CPUINFO_FIELD_RE.findall(block))
+        if not fields:
             continue
-        path = os.path.join(base, f"cpu{cpu}", "topology", "thread_siblings_list")
         try:
-            with open(path, "r") as f:
-                spec = f.read().strip()
-            sibs = [c for c in _parse_cpulist_spec(spec) if c in avail]
-            if not sibs:
-                sibs = [cpu]
+            key = (int(fields["physical id"]), int(fields["core id"]))
+            cores.setdefault(key, []).append(int(fields["processor"]))
+        except KeyError:
+            return None
+    if not cores:
+        return None
+    siblings: Dict[int, Tuple[int, ...]] = {}
+    for members in cores.values():
+        group = tuple(sorted(members))
+        for c in group:
+            siblings[c] = group
+    return siblings
+
+
+@functools.lru_cache(maxsize=None)
+def _core_siblings(cpu: int) -> Tuple[int, ...]:
+    """Return all SMT siblings of cpu (including itself), sorted; sysfs is read once per CPU per process."""
+    # Don't probe (and fail to open) files for CPUs sysfs doesn't list
+    if cpu in _sysfs_cpu_ids():
+        try:
+            sibs = tuple(sorted(_parse_cpulist_spec(_read_sysfs(_siblings_path(cpu)))))
         except Exception:
-            sibs = [cpu]
+            sibs = ()
+        if sibs:
+            return sibs
+    from_cpuinfo = _cpuinfo_siblings()
+    if from_cpuinfo is not None and cpu in from_cpuinfo:
+        return from_cpuinfo[cpu]
+    return (cpu,)
+
+
+@functools.lru_cache(maxsize=8)
+def _thread_sibling_groups(avail: FrozenSet[int]) -> Tuple[Tuple[int, ...], ...]:
+    """Build SMT sibling groups from sysfs; each group is a tuple of CPU ids (primary first).
+
+    Topology does not change during a run, so results are cached per availability set.
+    """
+    if not avail:
+        return ()
+    cpus = sorted(avail)
+    # Dense bitmap of CPUs already placed in a group; cheaper than a set for small ids
+    assigned = bytearray(cpus[-1] + 1)
+    groups: List[Tuple[int, ...]] = []
+    for cpu in cpus:
+        if assigned[cpu]:
+            continue
+        # Walking in id order, the first unassigned member is the group's lowest id, so
+        # groups come out sorted by primary and members are already sorted
+        sibs = tuple(c for c in _core_siblings(cpu) if c in avail) or (cpu,)
         for c in sibs:
-            seen.add(c)
-        groups.append(sorted(sibs))
-    # Sort groups by their primary (lowest id)
-    groups.sort(key=lambda g: g[0] if g else 1 << 30)
-    return groups
+            assigned[c] = 1
+        groups.append(sibs)
+    return tuple(groups)
+
+
+@functools.lru_cache(maxsize=None)
+def _cpu_capacity(cpu: int) -> int:
+    """Relative core performance from sysfs cpu_capacity (asymmetric CPUs only), else 0.
+
+    cpuinfo_max_freq is deliberately not used: with Turbo Boost Max 3.0 or amd-pstate
+    preferred cores it differs slightly per core on otherwise identical cores.
+    """
+    try:
+        return int(_read_sysfs(f"{_SYSFS_CPU}/cpu{cpu}/cpu_capacity"))
+    except (OSError, ValueError):
+        return 0
+
+
+_SYSFS_NODE = "/sys/devices/system/node"
+
+
+@functools.lru_cache(maxsize=1)
+def numa_node_cpus() -> Tuple[Tuple[int, FrozenSet[int]], ...]:
+    """(node id, cpus) for every NUMA node in sysfs that has CPUs; empty when the kernel exposes none."""
+    nodes: List[Tuple[int, FrozenSet[int]]] = []
+    try:
+        with os.scandir(_SYSFS_NODE) as it:
+            for e in it:
+                if not (e.name.startswith("node") and e.name[4:].isdigit()):
+                    continue
+                try:
+                    cpus = frozenset(_parse_cpulist_spec(_read_sysfs(f"{_SYSFS_NODE}/{e.name}/cpulist")))
+                except OSError:
+                    continue
+                # Memory-only nodes (e.g. CXL expanders) have nothing to pin to
+                if not cpus:
+                    continue
+                nodes.append((int(e.name[4:]), cpus))
+    except OSError:
+        return ()
+    return tuple(sorted(nodes))
+
+
+@functools.lru_cache(maxsize=1)
+def numa_split_cpus() -> Tuple[FrozenSet[int], FrozenSet[int]]:
+    """Usable CPUs of the first two NUMA nodes that have any, for splitting workers and senders.
+
+    Raises ValueError when fewer than two nodes have CPUs available to this process.
+    """
+    avail = frozenset(_available_cpus())
+    pools = [p for p in (cpus & avail for _, cpus in numa_node_cpus()) if p]
+    if len(pools) < 2:
+        raise ValueError(f"Splitting across NUMA nodes needs two nodes with usable CPUs; found {len(pools)}")
+    return pools[0], pools[1]
+
+
+def numa_node_for_cpus(cpus: Iterable[int]) -> Optional[int]:
+    """Return the NUMA node holding all of cpus.
+
+    None when the host has a single node (nothing to bind) or the CPUs span several nodes.
+    """
+    nodes = numa_node_cpus()
+    if len(nodes) < 2:
+        return None
+    wanted = frozenset(cpus)
+    if not wanted:
+        return None
+    for node, node_cpus in nodes:
+        if wanted <= node_cpus:
+            return node
+    return None
 
 
-def choose_cpus(n: int, exclude: Optional[Set[int]] = None) -> List[int]:
+def choose_cpus(n: int, exclude: Optional[Set[int]] = None, allow: Optional[Iterable[int]] = None) -> List[int]:
     """Choose up to n CPUs per policy:
     - Prefer one hardware thread per physical core first (no SMT sharing).
+    - Prefer higher-capacity cores (P-cores over E-cores on hybrid CPUs).
     - Avoid CPU 0 for primaries when possible.
     - If we'd otherwise have to start using SMT siblings, prefer taking CPU 0 next.
     - Only then, start allocating SMT siblings (second thread per core).
 
-    The optional 'exclude' set removes CPUs from consideration upfront.
+    The optional 'exclude' set removes CPUs from consideration upfront; 'allow', when
+    given, restricts the choice to those CPUs (e.g. one NUMA node's cpulist).
     """
-    avail_list = _available_cpus()
-    avail: Set[int] = set(avail_list)
+    avail: FrozenSet[int] = frozenset(_available_cpus())
     if exclude:
-        avail -= set(exclude)
+        avail -= frozenset(exclude)
+    if allow is not None:
+        avail &= frozenset(allow)
     if not avail:
         return []
     groups = _thread_sibling_groups(avail)
 
-    def _full_siblings(cpu: int) -> List[int]:
-        base = "/sys/devices/system/cpu"
-        path = os.path.join(base, f"cpu{cpu}", "topology", "thread_siblings_list")
-        try:
-            with open(path, "r") as f:
-                spec = f.read().strip()
-            return sorted(_parse_cpulist_spec(spec))
-        except Exception:
-            return [cpu]
-
     # Build a structure mapping each available group to its core-primary (from full sysfs, not filtered by avail)
     core_groups = []  # list of tuples: (core_primary:int, available_members:List[int])
     seen_cores: Set[int] = set()
     for g in groups:
         if not g:
             continue
-        full = _full_siblings(g[0])
+        full = _core_siblings(g[0])
         primary = min(full) if full else g[0]
         core_id_key = tuple(full)
         if primary in seen_cores:
@@ -107,35 +268,70 @@ def choose_cpus(n: int, exclude: Optional[Set[int]] = None) -> List[int]:
             continue
         core_groups.append((primary, avail_members))
 
-    # Sort core groups by their primary id
-    core_groups.sort(key=lambda t: t[0])
+    # Rank every available CPU once by (is SMT sibling, -capacity, is CPU 0, cpu id):
+    # core primaries before any SMT sibling, faster cores (P-cores, big cores) before
+    # slower ones, and CPU 0 after the other primaries of the same capacity. The key is
+    # total, so core_groups needs no ordering of its own.
+    ranked = (
+        (int(c != primary), -_cpu_capacity(c), int(c == 0), c)
+        for primary, avail_members in core_groups
+        for c in avail_members
+    )
+    # Partial selection: n is usually far smaller than the CPU count
+    return [r[-1] for r in heapq.nsmallest(n, ranked)]
+
+
+def smt_siblings(cpus: Iterable[int]) -> FrozenSet[int]:
+    """cpus together with every SMT sibling of them, i.e. all hardware threads of their cores."""
+    return frozenset(s for c in cpus for s in _core_siblings(c))
+
+
+def _online_path(cpu: int) -> str:
+    return f"{_SYSFS_CPU}/cpu{cpu}/online"
+
+
+# CPUs taken offline by offline_siblings() and not brought back yet
+_offlined: Set[int] = set()
 
-    order: List[int] = []
-    # 1) Take primaries of non-zero cores first, but only if that primary CPU id is available
-    for primary, avail_members in core_groups:
-        if primary == 0:
+
+def offline_siblings(cpus: Iterable[int]) -> List[int]:
+    """Take the SMT siblings of cpus offline so each pinned thread has its core to itself.
+
+    Siblings that are themselves in cpus, CPU 0 (usually not hot-pluggable) and CPUs already
+    offline are left alone. Returns the CPUs actually taken offline, for set_cpus_online().
+    Needs root; on a permission error it warns once and gives up.
+    """
+    keep = frozenset(cpus)
+    candidates = sorted(smt_siblings(keep) - keep - {0})
+    done: List[int] = []
+    for cpu in candidates:
+        path = _online_path(cpu)
+        try:
+            if _read_sysfs(path) != "1":
+                continue
+            _write_sysfs(path, "0")
+        except PermissionError as e:
+            print(f"Cannot take SMT siblings offline (needs root): {e}", file=sys.stderr)
+            break
+        except OSError as e:
+            print(f"Could not take CPU {cpu} offline: {e}", file=sys.stderr)
             continue
-        if primary in avail and len(order) < n:
-            order.append(primary)
-
-    # 2) If still need more, and CPU 0 primary is available, take it BEFORE any SMT siblings
-    if len(order) < n:
-        for primary, avail_members in core_groups:
-            if primary == 0 and 0 in avail:
-                order.append(0)
-                break
-
-    # 3) If still need more, start adding SMT siblings from all groups (including zero's siblings)
-    if len(order) < n:
-        for primary, avail_members in core_groups:
-            # iterate members skipping primary (even if unavailable, list is in full order primary first)
-            start_idx = 1 if (avail_members and avail_members[0] == primary) else 0
-            for c in avail_members[start_idx:]:
-                if len(order) >= n:
-                    break
-                if c not in order and c in avail:
-                    order.append(c)
-            if len(order) >= n:
-                break
-
-    return order[:n]
+        done.append(cpu)
+        _offlined.add(cpu)
+    return done
+
+
+def set_cpus_online(cpus: Iterable[int]) -> None:
+    """Bring CPUs taken down by offline_siblings() back online; failures only warn."""
+    for cpu in cpus:
+        _offlined.discard(cpu)
+        try:
+            _write_sysfs(_online_path(cpu), "1")
+        except OSError as e:
+            print(f"Could not bring CPU {cpu} back online: {e}", file=sys.stderr)
+
+
+@atexit.register
+def _restore_offlined() -> None:
+    # Safety net for exits that skip the caller's cleanup; never leave the host with CPUs down
+    set_cpus_online(sorted(_offlined))
@@ -1,9 +1,14 @@
 from __future__ import annotations
 import dataclasses as dc
-from typing import Any, Dict, List, Optional, get_type_hints
+import sys
+from collections import defaultdict
+from typing import Any, Callable, DefaultDict, Dict, List, Optional, Union, get_args, get_origin, get_type_hints
 
 from .types import FixedParams, Scenario
 
+# Resolved once: FixedParams uses string annotations, so this walks and evaluates all of them
+_FIXED_TYPES: Dict[str, Any] = get_type_hints(FixedParams)
+
 
 def _parse_bool(s: str) -> bool:
     sl = s.strip().lower()
@@ -14,24 +19,39 @@ def _parse_bool(s: str) -> bool:
     raise ValueError(f"Invalid boolean value: {s}")
 
 
-def _coerce_value(key: str, value: str, fixed_types: Dict[str, Any]):
-    t = fixed_types.get(key)
-    if t is None:
-        return value
-    if t is bool:
-        return _parse_bool(value)
-    if t is int:
-        return int(value)
-    if t is str:
-        return value
-    # Best-effort fallback
+def _unwrap_optional(t: Any) -> Any:
+    """Optional[X] -> X; other annotations are returned unchanged."""
+    if get_origin(t) is Union:
+        args = [a for a in get_args(t) if a is not type(None)]
+        if len(args) == 1:
+            return args[0]
+    return t
+
+
+# One parser per FixedParams field, resolved once at import; unknown annotations keep the raw string
+_COERCERS: Dict[str, Callable[[str], Any]] = {
+    name: {bool: _parse_bool, int: int, float: float, str: str}.get(_unwrap_optional(t), str)
+    for name, t in _FIXED_TYPES.items()
+}
+
+
+def _coerce_value(key: str, value: str) -> Any:
+    return _COERCERS.get(key, str)(value)
+
+
+def _add_override(overrides: Dict[str, Any], key: str, value: str) -> None:
+    """Coerce once at parse time; unknown keys are dropped and bad values reported."""
+    if key not in _COERCERS:
+        return
     try:
-        return int(value)
-    except Exception:
-        try:
-            return _parse_bool(value)
-        except Exception:
-            return value
+        overrides[key] = _coerce_value(key, value)
+    except ValueError as e:
+        print(f"Ignoring override {key}={value!r}: {e}", file=sys.stderr)
+
+
+def _apply_overrides(fixed: FixedParams, overrides: Dict[str, Any]) -> None:
+    for k, v in overrides.items():
+        setattr(fixed, k, v)
 
 
 def apply_fixedparams_overrides(scenarios: List[Scenario], global_fixed: Optional[List[str]] = None,
@@ -44,45 +64,27 @@ def apply_fixedparams_overrides(scenarios: List[Scenario], global_fixed: Optiona
     global_fixed = global_fixed or []
     scenario_fixed = scenario_fixed or []
 
-    fixed_types = get_type_hints(FixedParams)
-
     # Parse globals
-    global_overrides: Dict[str, str] = {}
+    global_overrides: Dict[str, Any] = {}
     for item in global_fixed:
-        if "=" not in item:
+        k, sep, v = item.partition("=")
+        if not sep:
             # ignore silently; caller may have logged
             continue
-        k, v = item.split("=", 1)
-        global_overrides[k.strip()] = v.strip()
+        _add_override(global_overrides, k.strip(), v.strip())
 
     # Parse per-scenario
-    scenario_overrides: Dict[str, Dict[str, str]] = {}
+    scenario_overrides: DefaultDict[str, Dict[str, Any]] = defaultdict(dict)
     for item in scenario_fixed:
-        if ":" not in item or "=" not in item:
+        scen_part, sep, kv = item.partition(":")
+        if not sep:
             continue
-        scen_part, kv = item.split(":", 1)
-        if "=" not in kv:
+        k, sep, v = kv.partition("=")
+        if not sep:
             continue
-        k, v = kv.split("=", 1)
-        scenario_overrides.setdefault(scen_part.strip(), {})[k.strip()] = v.strip()
+        _add_override(scenario_overrides[scen_part.strip()], k.strip(), v.strip())
 
-    # Apply
+    # Apply globals first so scenario-specific values win
     for sc in scenarios:
-        # Global
-        for k, v in global_overrides.items():
-            if not hasattr(sc.fixed, k):
-                continue
-            try:
-                setattr(sc.fixed, k, _coerce_value(k, v, fixed_types))
-            except Exception:
-                # ignore bad override
-                pass
-        # Scenario-specific
-        per = scenario_overrides.get(sc.name, {})
-        for k, v in per.items():
-            if not hasattr(sc.fixed, k):
-                continue
-            try:
-                setattr(sc.fixed, k, _coerce_value(k, v, fixed_types))
-            except Exception:
-                pass
+        _apply_overrides(sc.fixed, global_overrides)
+        _apply_overrides(sc.fixed, scenario_overrides.get(sc.name, {}))
@@ -21,3 +21,6 @@ PINGPONG_BIN_NAME = {
     "asio": "asio_pingpong",
     "asio_uring": "asio_uring_pingpong",
 }
+
+# Printed (and flushed) by receivers and the pingpong acceptor once their socket is listening
+READY_MARKER = b"listening on"
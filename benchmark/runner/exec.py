@@ -1,32 +1,39 @@
 from __future__ import annotations
+import copy
 import dataclasses as dc
+import functools
 import json
-import re
+import queue
 import shlex
+import shutil
 import signal
 import subprocess
 import sys
-import time
+import tempfile
+import threading
 import argparse
+from concurrent.futures import CancelledError, ThreadPoolExecutor
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, List, Optional, Sequence, get_type_hints, Set, Iterable, Callable
+from typing import Any, Dict, FrozenSet, List, Optional, Sequence, Set, Iterable, Callable, Tuple
 import os
 
-from .constants import RECEIVER_BIN_NAME, CLIENT_BIN_NAME, PINGPONG_BIN_NAME
-from .types import FixedParams, Scenario
-from .affinity import choose_cpus
-from .utils import has_flag_or_kv
+from .constants import RECEIVER_BIN_NAME, CLIENT_BIN_NAME, PINGPONG_BIN_NAME, READY_MARKER
+from .types import FixedParams, Scenario, fixed_params_dict
+from .affinity import choose_cpus, numa_node_for_cpus, numa_split_cpus, offline_siblings, set_cpus_online, smt_siblings
+from .utils import has_flag_or_kv, missing_binaries, start_ssh_master, stop_ssh_master, wait_for_log_marker
 from .config import apply_fixedparams_overrides
-from .utils import apply_scenario_var_values, run_plot as _run_plot
+from .utils import apply_scenario_var_values, run_plot as _run_plot, start_plot as _start_plot
 from .receiver_client import (
     ensure_receiver_binaries as rc_ensure_binaries,
+    receiver_log_path as rc_receiver_log_path,
     start_receiver as rc_start_receiver,
     run_client as rc_run_client,
     stop_receiver as rc_stop_receiver,
 )
 from .pingpong import (
     ensure_pingpong_binaries as pp_ensure_binaries,
+    acceptor_log_path as pp_acceptor_log_path,
     start_acceptor as pp_start_acceptor,
     run_initiator as pp_run_initiator,
 )
@@ -38,67 +45,186 @@ REPO_ROOT = Path(__file__).resolve().parents[2]
 def ts_utc_compact() -> str:
     return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H-%M-%SZ")
 
+
+def _scenario_to_jsonable(sc: Scenario) -> Dict[str, Any]:
+    """Shallow, JSON-ready view of a Scenario.
+
+    dc.asdict deep-copies every field; json.dumps only needs to read them. Linkage
+    callables are replaced by their names.
+    """
+    d = {f.name: getattr(sc, f.name) for f in dc.fields(sc)}
+    d["fixed"] = fixed_params_dict(sc.fixed)
+    d["linkages"] = {
+        k: f"callable:{getattr(v, '__name__', None) or repr(v)}" if callable(v) else v
+        for k, v in sc.linkages.items()
+    }
+    return d
+
+
+# choose_cpus only depends on the (fixed) host topology and its arguments, so the
+# per-variation auto-assignment below is memoized on the inputs that matter.
+@functools.lru_cache(maxsize=None)
+def _auto_cpus(n: int, exclude: FrozenSet[int] = frozenset(), allow: Optional[FrozenSet[int]] = None) -> Tuple[int, ...]:
+    return tuple(choose_cpus(n, exclude=set(exclude), allow=allow))
+
+
+def _auto_cpu_list(n: int, exclude: FrozenSet[int] = frozenset(), allow: Optional[FrozenSet[int]] = None) -> str:
+    """Comma-separated choose_cpus(n, exclude, allow), as used by worker_cpus/sender_cpus."""
+    return ",".join(map(str, _auto_cpus(n, exclude, allow)))
+
+
+@functools.lru_cache(maxsize=None)
+def _auto_pingpong_cpus(
+    preset: Tuple[Optional[int], Optional[int], Optional[int], Optional[int]],
+    local_acceptor: bool,
+    local_initiator: bool,
+    exclude: FrozenSet[int] = frozenset(),
+) -> Tuple[Optional[int], Optional[int], Optional[int], Optional[int]]:
+    """Fill unset (acceptor, acceptor sqpoll, initiator, initiator sqpoll) CPUs, avoiding preset ones."""
+    used: Set[int] = {int(v) for v in preset if v is not None} | exclude
+    cpus = list(preset)
+    unset = [i for i, local in ((0, local_acceptor), (1, local_acceptor), (2, local_initiator), (3, local_initiator))
+             if local and cpus[i] is None]
+    # One call for all unset slots; slots left over when CPUs run out stay None
+    for i, cpu in zip(unset, choose_cpus(len(unset), exclude=used)):
+        cpus[i] = cpu
+    return tuple(cpus)
+
+
 # Single helper to assign CPUs when auto_cpu is enabled. Updates FixedParams in-place.
 def assign_auto_cpus_ids(
     fixed: FixedParams,
     receiver_host: str,
     client_host: str,
     mode: str,
+    exclude: FrozenSet[int] = frozenset(),
+    numa_split: bool = False,
 ) -> None:
     """Populate CPU-related fields in FixedParams in-place when running locally.
 
     - mode == 'pingpong': assigns pp_acceptor_cpu, pp_initiator_cpu, and per-process sqpoll CPUs (uring only).
     - mode == 'receiver': assigns worker_cpus and sender_cpus, avoiding overlaps when both ends are local.
+
+    CPUs in 'exclude' (e.g. held by concurrently running variations) are never picked. With
+    'numa_split' and both ends local, workers are taken from the first NUMA node with usable
+    CPUs and senders from the second (ValueError if there is no second one).
     """
     if mode == 'pingpong':
-        used: Set[int] = set()
-        for val in (fixed.pp_acceptor_cpu, fixed.pp_initiator_cpu, fixed.pp_acceptor_sqpoll_cpu, fixed.pp_initiator_sqpoll_cpu):
-            if val is not None:
-                used.add(int(val))
-
-        if receiver_host == 'local':
-            if fixed.pp_acceptor_cpu is None:
-                acc = choose_cpus(1, exclude=used)
-                if acc:
-                    fixed.pp_acceptor_cpu = acc[0]
-                    used.add(acc[0])
-            if fixed.pp_acceptor_sqpoll_cpu is None:
-                sq = choose_cpus(1, exclude=used)
-                if sq:
-                    fixed.pp_acceptor_sqpoll_cpu = sq[0]
-                    used.add(sq[0])
-
-        if client_host == 'local':
-            if fixed.pp_initiator_cpu is None:
-                ini = choose_cpus(1, exclude=used)
-                if ini:
-                    fixed.pp_initiator_cpu = ini[0]
-                    used.add(ini[0])
-            if fixed.pp_initiator_sqpoll_cpu is None:
-                sqi = choose_cpus(1, exclude=used)
-                if sqi:
-                    fixed.pp_initiator_sqpoll_cpu = sqi[0]
-                    used.add(sqi[0])
+        preset = (fixed.pp_acceptor_cpu, fixed.pp_acceptor_sqpoll_cpu,
+                  fixed.pp_initiator_cpu, fixed.pp_initiator_sqpoll_cpu)
+        (fixed.pp_acceptor_cpu, fixed.pp_acceptor_sqpoll_cpu,
+         fixed.pp_initiator_cpu, fixed.pp_initiator_sqpoll_cpu) = _auto_pingpong_cpus(
+            preset, receiver_host == 'local', client_host == 'local', exclude)
 
     else:
         # receiver/client runs
-        if receiver_host == 'local' and not fixed.worker_cpus and int(fixed.workers) > 0:
-            rcpu = choose_cpus(int(fixed.workers))
+        worker_allow: Optional[FrozenSet[int]] = None
+        sender_allow: Optional[FrozenSet[int]] = None
+        if numa_split and receiver_host == client_host == 'local':
+            worker_allow, sender_allow = numa_split_cpus()
+        workers = int(fixed.workers)
+        senders = int(getattr(fixed, 'senders', 0))
+        if (receiver_host == client_host == 'local' and worker_allow is None and workers > 0 and senders > 0
+                and not fixed.worker_cpus and not fixed.sender_cpus):
+            # Both ends drawn from the same pool: one choose_cpus call, workers first. The
+            # ranking doesn't depend on 'exclude', so this is what two calls would pick.
+            both = _auto_cpus(workers + senders, exclude)
+            if both[:workers]:
+                fixed.worker_cpus = ",".join(map(str, both[:workers]))
+            if both[workers:]:
+                fixed.sender_cpus = ",".join(map(str, both[workers:]))
+            return
+
+        if receiver_host == 'local' and not fixed.worker_cpus and workers > 0:
+            rcpu = _auto_cpu_list(workers, exclude, worker_allow)
             if rcpu:
-                fixed.worker_cpus = ",".join(str(c) for c in rcpu)
+                fixed.worker_cpus = rcpu
 
         if client_host == 'local' and not fixed.sender_cpus:
-            senders = int(getattr(fixed, 'senders', 0))
             if senders > 0:
-                exclude: Set[int] = set()
+                sender_exclude = exclude
                 if receiver_host == 'local' and fixed.worker_cpus:
                     try:
-                        exclude = {int(x) for x in str(fixed.worker_cpus).split(',') if x}
+                        sender_exclude = exclude | frozenset(int(x) for x in str(fixed.worker_cpus).split(',') if x)
                     except Exception:
-                        exclude = set()
-                scpu = choose_cpus(senders, exclude=exclude)
+                        sender_exclude = exclude
+                scpu = _auto_cpu_list(senders, sender_exclude, sender_allow)
                 if scpu:
-                    fixed.sender_cpus = ",".join(str(c) for c in scpu)
+                    fixed.sender_cpus = scpu
+
+
+def _wanted_auto_cpus(fixed: FixedParams, receiver_host: str, client_host: str, mode: str) -> int:
+    """How many CPUs assign_auto_cpus_ids should pick for fixed, given what is already set."""
+    if mode == 'pingpong':
+        slots: List[Optional[int]] = []
+        if receiver_host == 'local':
+            slots += [fixed.pp_acceptor_cpu, fixed.pp_acceptor_sqpoll_cpu]
+        if client_host == 'local':
+            slots += [fixed.pp_initiator_cpu, fixed.pp_initiator_sqpoll_cpu]
+        return sum(cpu is None for cpu in slots)
+    n = 0
+    if receiver_host == 'local' and not fixed.worker_cpus:
+        n += max(int(fixed.workers), 0)
+    if client_host == 'local' and not fixed.sender_cpus:
+        n += max(int(getattr(fixed, 'senders', 0)), 0)
+    return n
+
+
+def _pinned_cpus(fixed: FixedParams) -> Set[int]:
+    """All CPU ids FixedParams pins processes to (workers, senders, pingpong and sqpoll threads)."""
+    cpus: Set[int] = set()
+    for spec in (fixed.worker_cpus, fixed.sender_cpus):
+        if spec:
+            cpus.update(int(x) for x in str(spec).split(",") if x.strip())
+    for cpu in (fixed.pp_acceptor_cpu, fixed.pp_acceptor_sqpoll_cpu,
+                fixed.pp_initiator_cpu, fixed.pp_initiator_sqpoll_cpu):
+        if cpu is not None:
+            cpus.add(int(cpu))
+    return cpus
+
+
+def _offset_port(address: str, offset: int) -> str:
+    """'host:port' with the port moved up by offset."""
+    host, _, port = address.rpartition(":")
+    return f"{host}:{int(port) + offset}"
+
+
+# Linkage results are numbers; coerce them to the type the target field holds. Fields
+# without a typed value (None defaults) take the result as is.
+_LINKAGE_COERCERS: Dict[type, Callable[[Any], Any]] = {
+    bool: lambda r: bool(int(round(r))),
+    int: lambda r: int(round(r)),
+    str: lambda r: str(int(round(r))),
+}
+
+
+def _linkage_coercers(sc: Scenario) -> Dict[str, Callable[[Any], Any]]:
+    """Coercion for each linkage target, picked once per scenario from its value in sc.fixed."""
+    return {target: _LINKAGE_COERCERS.get(type(getattr(sc.fixed, target)), lambda r: r)
+            for target in sc.linkages}
+
+
+def _resolve_variation(sc: Scenario, val: Any, coercers: Dict[str, Callable[[Any], Any]]) -> FixedParams:
+    """sc.fixed with the variable set to val and the linkages applied."""
+    # FixedParams only holds scalars, so a shallow copy is enough (see FixedParams.__copy__)
+    fixed = copy.copy(sc.fixed)
+    setattr(fixed, sc.var_key, val)
+    # Apply linkages to compute dependent fields; they are validated when the Scenario is constructed
+    for target, expr in sc.linkages.items():
+        setattr(fixed, target, coercers[target](expr(fixed)))
+    return fixed
+
+
+@dc.dataclass(frozen=True)
+class _Variation:
+    """One (impl, value) point of a scenario; the per-impl pieces are shared by all its values
+    and the resolved FixedParams by all its impls."""
+    impl: str
+    val: Any
+    fixed: FixedParams
+    base_tags: Dict[str, str]
+    extra_impl: Tuple[str, ...]
+
 
 class Runner:
     def __init__(self,
@@ -109,7 +235,11 @@ class Runner:
                  client_app_dir: Optional[Path] = None,
                  impl_extra_args: Optional[Dict[str, List[str]]] = None,
                  auto_cpu_ids: bool = False,
-                 client_extra_args: Optional[List[str]] = None):
+                 client_extra_args: Optional[List[str]] = None,
+                 no_logs: bool = False,
+                 parallel_variations: int = 1,
+                 numa_split: bool = False,
+                 offline_siblings: bool = False):
         self.app_dir = app_dir
         self.receiver_host = receiver_host
         self.client_host = client_host
@@ -119,27 +249,143 @@ class Runner:
         # controls all automatic affinity selection (workers, senders, pingpong)
         self.auto_cpu_ids = auto_cpu_ids
         self.client_extra_args = client_extra_args or []
+        # Discard client/initiator stdout; server logs are kept since readiness is read from them
+        self.no_logs = no_logs
+        # Receiver workers on one NUMA node, client senders on another (auto CPU ids, both local)
+        self.numa_split = numa_split
+        # numactl is only used to add memory binding on multi-node hosts when CPUs are auto-assigned
+        self._have_numactl = auto_cpu_ids and shutil.which("numactl") is not None
+        # taskset confines each local process to its auto-assigned CPUs from before exec
+        self._have_taskset = auto_cpu_ids and shutil.which("taskset") is not None
+        if auto_cpu_ids and not self._have_taskset:
+            print("taskset not found; only the threads the binaries pin themselves stay on their CPUs",
+                  file=sys.stderr)
+        # Concurrent (impl, value) runs; each slot gets its own port and its own auto-assigned cores.
+        # Only meaningful when everything runs locally with --auto-cpu-ids.
+        self.parallel_variations = max(1, parallel_variations)
+        if self.parallel_variations > 1 and not (auto_cpu_ids and receiver_host == client_host == "local"):
+            print("--parallel-variations needs local receiver and client with --auto-cpu-ids; running serially",
+                  file=sys.stderr)
+            self.parallel_variations = 1
+        # Take SMT siblings of local pinned CPUs offline for each run (root only). Another
+        # concurrent run could be using those siblings, so this forces serial runs.
+        self.offline_siblings = offline_siblings
+        if self.offline_siblings and self.parallel_variations > 1:
+            print("--offline-siblings runs variations one at a time; ignoring --parallel-variations", file=sys.stderr)
+            self.parallel_variations = 1
+        # Cores (all SMT siblings) held by running variations; waiters are woken on release
+        self._cpu_cond = threading.Condition()
+        self._busy_cpus: Set[int] = set()
+        # Set when a parallel scenario is interrupted, so its runs still waiting for CPUs don't start
+        self._cancelled = False
+        self._live_servers: Set[subprocess.Popen] = set()
+        # Binaries already found on disk; scenarios share impls, so each path is stat'ed once per process
+        self._verified_bins: Set[Path] = set()
+        # One multiplexed ssh connection per remote host, opened on first use (see _ssh_control)
+        self._ssh_dir: Optional[str] = None
+        self._ssh_masters: Dict[str, Optional[str]] = {}
+        # cli_args.json is the same for every scenario of a run; serialized once per Namespace
+        self._cli_args_json: Optional[Tuple[argparse.Namespace, str]] = None
+
+    def _ssh_control(self, host: str) -> Optional[str]:
+        """ControlPath of the ssh master for a remote host, starting it on first use.
+
+        Saves a TCP handshake and authentication per run. None for local hosts, or if the
+        master could not be started. Remote runs are never parallel, so no locking is needed.
+        """
+        if host == "local":
+            return None
+        if host not in self._ssh_masters:
+            if self._ssh_dir is None:
+                self._ssh_dir = tempfile.mkdtemp(prefix="netbench-ssh-")
+            # Short path: control sockets are limited to ~100 bytes
+            path = f"{self._ssh_dir}/{len(self._ssh_masters)}"
+            self._ssh_masters[host] = path if start_ssh_master(host, path) else None
+        return self._ssh_masters[host]
+
+    def close(self) -> None:
+        """Shut down the ssh masters opened by this runner."""
+        for host, path in self._ssh_masters.items():
+            if path:
+                stop_ssh_master(host, path)
+        self._ssh_masters.clear()
+        if self._ssh_dir is not None:
+            shutil.rmtree(self._ssh_dir, ignore_errors=True)
+            self._ssh_dir = None
 
     def ensure_binaries(self, impls: Sequence[str]):
         if self.receiver_host == "local":
-            rc_ensure_binaries(self.receiver_app_dir, impls)
+            rc_ensure_binaries(self.receiver_app_dir, impls, verified=self._verified_bins)
         if self.client_host == "local":
             cpath = self.client_app_dir / CLIENT_BIN_NAME
-            if not cpath.exists():
+            if missing_binaries([cpath], self._verified_bins):
                 raise FileNotFoundError(f"Missing local client binary: {cpath}. Set --app-root correctly.")
 
     def ensure_pingpong_binaries(self, impls: Sequence[str]):
         if self.receiver_host == "local":
-            pp_ensure_binaries(self.receiver_app_dir, impls)
+            pp_ensure_binaries(self.receiver_app_dir, impls, verified=self._verified_bins)
 
     def _start_receiver(self, impl: str, fixed: FixedParams, results_dir: Path,
                         extra_tags: Dict[str, str], extra_impl_args: List[str]) -> subprocess.Popen:
+        node, cpus = self._placement(self.receiver_host, fixed.worker_cpus)
         return rc_start_receiver(self.receiver_host, self.receiver_app_dir, impl, fixed, results_dir,
-                                 extra_tags, extra_impl_args)
+                                 extra_tags, extra_impl_args, numa_node=node, affinity=cpus,
+                                 ssh_control=self._ssh_control(self.receiver_host))
 
-    def _run_client(self, fixed: FixedParams, duration_sec: int, results_dir: Path) -> int:
+    def _process_cpus(self, host: str, *cpu_specs: Any) -> Optional[Set[int]]:
+        """CPU set to confine a local process to when CPUs are auto-assigned; None otherwise.
+
+        The binaries pin their own threads from the CLI flags; the process mask (set before
+        exec by taskset or numactl) keeps the threads they don't pin on these CPUs as well.
+        """
+        if not (self.auto_cpu_ids and host == "local"):
+            return None
+        cpus: Set[int] = set()
+        try:
+            for spec in cpu_specs:
+                if spec is not None and spec != "":
+                    cpus.update(int(x) for x in str(spec).split(",") if x.strip())
+        except ValueError:
+            return None
+        return cpus or None
+
+    def _local_pinned_cpus(self, fixed: FixedParams, mode: str) -> Set[int]:
+        """CPUs pinned by the processes of this run that execute on this host."""
+        if mode == 'pingpong':
+            server_specs = (fixed.pp_acceptor_cpu, fixed.pp_acceptor_sqpoll_cpu)
+            client_specs = (fixed.pp_initiator_cpu, fixed.pp_initiator_sqpoll_cpu)
+        else:
+            server_specs, client_specs = (fixed.worker_cpus,), (fixed.sender_cpus,)
+        specs: List[Any] = []
+        if self.receiver_host == "local":
+            specs.extend(server_specs)
+        if self.client_host == "local":
+            specs.extend(client_specs)
+        cpus: Set[int] = set()
+        for spec in specs:
+            if spec is not None and spec != "":
+                cpus.update(int(x) for x in str(spec).split(",") if x.strip())
+        return cpus
+
+    def _numa_node(self, cpus: Optional[Set[int]]) -> Optional[int]:
+        """NUMA node to bind a local process to, if all its CPUs sit on one node of a multi-node host."""
+        if not (self._have_numactl and cpus):
+            return None
+        return numa_node_for_cpus(cpus)
+
+    def _placement(self, host: str, *cpu_specs: Any) -> Tuple[Optional[int], Optional[Set[int]]]:
+        """NUMA node and CPU mask for a local process; numactl sets the mask itself, otherwise taskset does."""
+        cpus = self._process_cpus(host, *cpu_specs)
+        node = self._numa_node(cpus)
+        return node, cpus if node is not None or self._have_taskset else None
+
+    def _run_client(self, fixed: FixedParams, duration_sec: int, results_dir: Path,
+                    server: Optional[subprocess.Popen] = None) -> int:
+        node, cpus = self._placement(self.client_host, fixed.sender_cpus)
         return rc_run_client(self.client_host, self.client_app_dir, fixed, duration_sec, results_dir,
-                             self.client_extra_args)
+                             self.client_extra_args, discard_output=self.no_logs,
+                             numa_node=node, server=server, affinity=cpus,
+                             ssh_control=self._ssh_control(self.client_host))
 
     def _stop_receiver(self, proc: subprocess.Popen, timeout: float = 60.0):
         """
@@ -149,14 +395,163 @@ class Runner:
         """
         return rc_stop_receiver(proc, timeout=timeout)
 
+    def _wait_ready(self, proc: subprocess.Popen, log_path: Path, timeout: float = 3.0) -> bool:
+        """Wait until the server logs that it is listening instead of sleeping a fixed time.
+
+        Gives up after 'timeout' (the old fixed delay) and lets the client start anyway.
+        Returns False only if the server exited first, in which case there is nothing to test.
+        """
+        if wait_for_log_marker(log_path, READY_MARKER, timeout, proc=proc):
+            return True
+        if proc.poll() is not None:
+            print(f"Server exited with {proc.returncode} before listening; see {log_path}", file=sys.stderr)
+            return False
+        print(f"No readiness line in {log_path} after {timeout}s; starting client anyway", file=sys.stderr)
+        return True
+
     # --- Pingpong helpers ---
     def _start_pingpong_acceptor(self, impl: str, fixed: FixedParams, results_dir: Path,
                                  extra_impl_args: Optional[List[str]] = None) -> subprocess.Popen:
-        return pp_start_acceptor(self.receiver_host, self.receiver_app_dir, impl, fixed, results_dir, extra_impl_args)
+        # Include the SQPOLL CPU: io_uring refuses a poller CPU outside the process' allowed set
+        cpus = self._process_cpus(self.receiver_host, fixed.pp_acceptor_cpu, fixed.pp_acceptor_sqpoll_cpu)
+        if not self._have_taskset:
+            cpus = None
+        return pp_start_acceptor(self.receiver_host, self.receiver_app_dir, impl, fixed, results_dir, extra_impl_args,
+                                 affinity=cpus, ssh_control=self._ssh_control(self.receiver_host))
 
     def _run_pingpong_initiator(self, impl: str, fixed: FixedParams, results_dir: Path,
-                                tags: Dict[str, str], extra_impl_args: Optional[List[str]] = None) -> int:
-        return pp_run_initiator(self.client_host, self.client_app_dir, impl, fixed, results_dir, tags, extra_impl_args)
+                                tags: Dict[str, str], extra_impl_args: Optional[List[str]] = None,
+                                server: Optional[subprocess.Popen] = None) -> int:
+        cpus = self._process_cpus(self.client_host, fixed.pp_initiator_cpu, fixed.pp_initiator_sqpoll_cpu)
+        if not self._have_taskset:
+            cpus = None
+        return pp_run_initiator(self.client_host, self.client_app_dir, impl, fixed, results_dir, tags, extra_impl_args,
+                                discard_output=self.no_logs, server=server, affinity=cpus,
+                                ssh_control=self._ssh_control(self.client_host))
+
+    def _claim_cpus(self, fixed: FixedParams, mode: str) -> Tuple[FixedParams, FrozenSet[int]]:
+        """Auto-assign CPUs for one run away from the cores held by concurrently running ones.
+
+        CPUs set by hand are reserved as well: the run waits until no other run holds their
+        cores. If the free cores can't cover the rest, it waits for other runs to release
+        theirs; with nothing else running it goes ahead with what there is and warns. Returns
+        the assigned copy of fixed and the cores it reserves (all SMT siblings of its CPUs).
+        """
+        preset = _pinned_cpus(fixed)
+        preset_cores = smt_siblings(preset)
+        wanted = _wanted_auto_cpus(fixed, self.receiver_host, self.client_host, mode)
+        with self._cpu_cond:
+            while True:
+                if not preset_cores & self._busy_cpus:
+                    assigned = copy.copy(fixed)
+                    assign_auto_cpus_ids(assigned, self.receiver_host, self.client_host, mode,
+                                         exclude=frozenset(self._busy_cpus), numa_split=self.numa_split)
+                    claimed = _pinned_cpus(assigned) - preset
+                    if len(claimed) >= wanted or not self._busy_cpus:
+                        break
+                self._cpu_cond.wait()
+                if self._cancelled:
+                    raise CancelledError()
+            if len(claimed) < wanted:
+                print(f"Only {len(claimed)} of {wanted} CPUs could be auto-assigned; "
+                      f"the remaining threads run unpinned", file=sys.stderr)
+            reserved = preset_cores | smt_siblings(claimed)
+            self._busy_cpus |= reserved
+        return assigned, reserved
+
+    def _run_variation(self, sc: Scenario, sc_dir: Path, job: _Variation, slot: int = 0) -> None:
+        """Run one (impl, value) point of a scenario: start the server, run the client, wait for shutdown."""
+        impl, val = job.impl, job.val
+        run_dir = sc_dir / impl / f"{sc.var_key}_{val}"
+        run_dir.mkdir(parents=True, exist_ok=True)
+
+        # Private copy: CPU auto-assignment and the port offset must not leak into other impls
+        fixed = copy.copy(job.fixed)
+        if slot:
+            fixed.address = _offset_port(fixed.address, slot)
+
+        tags = {**job.base_tags, sc.var_key: str(val)}
+        extra_impl = job.extra_impl
+        mode = getattr(sc, 'mode', 'receiver')
+
+        reserved: FrozenSet[int] = frozenset()
+        if self.auto_cpu_ids:
+            fixed, reserved = self._claim_cpus(fixed, mode)
+        offlined: List[int] = []
+        try:
+            if self.offline_siblings:
+                offlined = offline_siblings(self._local_pinned_cpus(fixed, mode))
+            if mode == 'pingpong':
+                # Start acceptor then run initiator which writes results into run_dir
+                aproc = self._start_pingpong_acceptor(impl, fixed, run_dir, extra_impl_args=extra_impl)
+                self._live_servers.add(aproc)
+                try:
+                    if self._wait_ready(aproc, pp_acceptor_log_path(run_dir, impl)):
+                        rc = self._run_pingpong_initiator(impl, fixed, run_dir, tags, extra_impl_args=extra_impl,
+                                                          server=aproc)
+                        if rc != 0:
+                            print(f"Pingpong initiator exited with {rc} for {impl} {sc.var_key}={val}",
+                                  file=sys.stderr)
+                    self._stop_receiver(aproc)
+                except BaseException:
+                    # The acceptor runs in its own session and never sees the terminal's SIGINT
+                    aproc.kill()
+                    raise
+                finally:
+                    self._live_servers.discard(aproc)
+            else:
+                rproc = self._start_receiver(impl, fixed, run_dir, tags, extra_impl)
+                self._live_servers.add(rproc)
+                try:
+                    if self._wait_ready(rproc, rc_receiver_log_path(run_dir, impl)):
+                        rc = self._run_client(fixed, sc.fixed.duration_sec, run_dir, server=rproc)
+                        if rc != 0:
+                            print(f"Client exited with {rc} for {impl} {sc.var_key}={val}", file=sys.stderr)
+                    self._stop_receiver(rproc)
+                except BaseException:
+                    # The receiver runs in its own session and never sees the terminal's SIGINT
+                    rproc.kill()
+                    raise
+                finally:
+                    self._live_servers.discard(rproc)
+        finally:
+            set_cpus_online(offlined)
+            if reserved:
+                with self._cpu_cond:
+                    self._busy_cpus -= reserved
+                    self._cpu_cond.notify_all()
+
+    def _run_variations_parallel(self, sc: Scenario, sc_dir: Path, jobs: List[_Variation]) -> None:
+        """Run up to parallel_variations (impl, value) points at once, one port/CPU slot each."""
+        # Start clean even if an earlier scenario on this runner was interrupted or failed
+        with self._cpu_cond:
+            self._cancelled = False
+            self._busy_cpus.clear()
+        slots: "queue.SimpleQueue[int]" = queue.SimpleQueue()
+        for i in range(self.parallel_variations):
+            slots.put(i)
+
+        def _job(job: _Variation) -> None:
+            slot = slots.get()
+            try:
+                self._run_variation(sc, sc_dir, job, slot)
+            finally:
+                slots.put(slot)
+
+        pool = ThreadPoolExecutor(max_workers=self.parallel_variations)
+        try:
+            for fut in [pool.submit(_job, job) for job in jobs]:
+                fut.result()
+        except BaseException:
+            # Only the main thread sees Ctrl-C: drop queued runs and take down servers still running
+            pool.shutdown(wait=False, cancel_futures=True)
+            with self._cpu_cond:
+                self._cancelled = True
+                self._cpu_cond.notify_all()
+            for proc in list(self._live_servers):
+                proc.kill()
+            raise
+        pool.shutdown()
 
     def run_scenario(self, sc: Scenario, out_root: Path, cli_args: Optional[argparse.Namespace] = None) -> Path:
         if getattr(sc, 'mode', 'receiver') == 'pingpong':
@@ -167,81 +562,35 @@ class Runner:
         sc_dir = out_root / f"{sc.name}_{run_id}"
         sc_dir.mkdir(parents=True, exist_ok=True)
         if cli_args:
-            (sc_dir / "cli_args.json").write_text(json.dumps(vars(cli_args), indent=2, default=str))
-        def _scenario_asdict_json(s: Scenario) -> Dict:
-            d = dc.asdict(s)
-            # Make linkages JSON-friendly if they contain callables
-            try:
-                links = d.get("linkages") or {}
-                for k, v in list(links.items()):
-                    if callable(v):
-                        name = getattr(v, "__name__", None)
-                        links[k] = f"callable:{name or repr(v)}"
-            except Exception:
-                pass
-            return d
-
-        (sc_dir / "scenario.json").write_text(json.dumps(_scenario_asdict_json(sc), indent=2))
-
+            if self._cli_args_json is None or self._cli_args_json[0] is not cli_args:
+                self._cli_args_json = (cli_args, json.dumps(vars(cli_args), indent=2, default=str))
+            (sc_dir / "cli_args.json").write_text(self._cli_args_json[1])
+        (sc_dir / "scenario.json").write_text(json.dumps(_scenario_to_jsonable(sc), indent=2))
+
+        # Linkages depend only on the value, so resolve each value once for all impls
+        coercers = _linkage_coercers(sc)
+        resolved = [(val, _resolve_variation(sc, val, coercers)) for val in sc.var_values]
+        jobs: List[_Variation] = []
         for impl in sc.implementations:
-            impl_dir = sc_dir / impl
-            impl_dir.mkdir(parents=True, exist_ok=True)
-            for val in sc.var_values:
-                run_dir = impl_dir / f"{sc.var_key}_{val}"
-                run_dir.mkdir(parents=True, exist_ok=True)
-
-                fixed = dc.replace(sc.fixed)
-                setattr(fixed, sc.var_key, val)
-                # Apply linkages to compute dependent fields
-                if sc.linkages:
-                    for target, expr in sc.linkages.items():
-                        if not hasattr(fixed, target):
-                            raise AttributeError(f"FixedParams has no field '{target}' (from linkage)")
-                        # Only single-argument callables are supported: fn(fixed) -> Any
-                        if not callable(expr):
-                            raise TypeError(
-                                f"Unsupported linkage type for '{target}': expected callable, got {type(expr).__name__}")
-                        result = expr(fixed)
-                        # Coerce to the type of the target field
-                        current = getattr(fixed, target)
-                        if isinstance(current, bool):
-                            setattr(fixed, target, bool(int(round(result))))
-                        elif isinstance(current, int):
-                            setattr(fixed, target, int(round(result)))
-                        elif isinstance(current, str):
-                            setattr(fixed, target, str(int(round(result))))
-                        else:
-                            setattr(fixed, target, result)
-
-                tags = {"scenario": sc.name, "impl": impl, sc.var_key: str(val)}
-                extra_impl = list(sc.impl_extra.get(impl, [])) + list(self.impl_extra_args.get(impl, []))
-
-                if getattr(sc, 'mode', 'receiver') == 'pingpong':
-                    # Start acceptor then run initiator which writes results into run_dir
-                    if self.auto_cpu_ids:
-                        assign_auto_cpus_ids(fixed, self.receiver_host, self.client_host, 'pingpong')
-
-                    aproc = self._start_pingpong_acceptor(impl, fixed, run_dir, extra_impl_args=extra_impl)
-                    time.sleep(3)
-                    rc = self._run_pingpong_initiator(impl, fixed, run_dir, tags, extra_impl_args=extra_impl)
-                    if rc != 0:
-                        print(f"Pingpong initiator exited with {rc} for {impl} {sc.var_key}={val}", file=sys.stderr)
-                    self._stop_receiver(aproc)
-                else:
-                    if self.auto_cpu_ids:
-                        assign_auto_cpus_ids(fixed, self.receiver_host, self.client_host, 'receiver')
-
-                    rproc = self._start_receiver(impl, fixed, run_dir, tags, extra_impl)
-                    time.sleep(3)
-                    rc = self._run_client(fixed, sc.fixed.duration_sec, run_dir)
-                    if rc != 0:
-                        print(f"Client exited with {rc} for {impl} {sc.var_key}={val}", file=sys.stderr)
-                    self._stop_receiver(rproc)
+            base_tags = {"scenario": sc.name, "impl": impl}
+            extra_impl = (*sc.impl_extra.get(impl, ()), *self.impl_extra_args.get(impl, ()))
+            jobs.extend(_Variation(impl, val, fixed, base_tags, extra_impl) for val, fixed in resolved)
+        if self.parallel_variations > 1 and len(jobs) > 1:
+            self._run_variations_parallel(sc, sc_dir, jobs)
+        else:
+            for job in jobs:
+                self._run_variation(sc, sc_dir, job)
 
         print(f"Scenario '{sc.name}' finished: {sc_dir}")
         return sc_dir
 
 
+def _exit_on_signal(signum: int, frame: Any) -> None:
+    # Children run in their own sessions and never see the terminal's signals, so turn
+    # SIGTERM/SIGHUP into an exception that unwinds through the kill/cleanup paths
+    raise SystemExit(128 + signum)
+
+
 def run_from_args(args, scenarios: List[Scenario]) -> int:
     # Filter scenarios and implementations
     scs = list(scenarios)
@@ -254,10 +603,10 @@ def run_from_args(args, scenarios: List[Scenario]) -> int:
     # Parse impl extra args
     impl_extra_args: Dict[str, List[str]] = {}
     for item in getattr(args, 'impl_arg', []) or []:
-        if "=" not in item:
+        impl, sep, tok = item.partition("=")
+        if not sep:
             print(f"Ignoring --impl-arg without '=': {item}", file=sys.stderr)
             continue
-        impl, tok = item.split("=", 1)
         impl = impl.strip()
         if impl not in RECEIVER_BIN_NAME:
             print(f"Unknown impl in --impl-arg: {impl}", file=sys.stderr)
@@ -272,6 +621,10 @@ def run_from_args(args, scenarios: List[Scenario]) -> int:
         client_app_dir=args.client_app_root,
         impl_extra_args=impl_extra_args,
         auto_cpu_ids=getattr(args, 'auto_cpu_ids', False),
+        no_logs=getattr(args, 'no_logs', False),
+        parallel_variations=getattr(args, 'parallel_variations', 1),
+        numa_split=getattr(args, 'numa_split', False),
+        offline_siblings=getattr(args, 'offline_siblings', False),
     )
 
     args.out.mkdir(parents=True, exist_ok=True)
@@ -279,50 +632,23 @@ def run_from_args(args, scenarios: List[Scenario]) -> int:
     # Apply FixedParams overrides
     apply_fixedparams_overrides(scs, getattr(args, 'fixed_params', None), getattr(args, 'scenario_fixed', None))
 
-    # Parse helper for var_values specs
-    def _parse_int_list_spec(spec: str) -> List[int]:
-        s = spec.strip()
-        if not s:
-            return []
-        if "," in s:
-            try:
-                return [int(x.strip()) for x in s.split(",") if x.strip()]
-            except Exception:
-                raise ValueError(f"Invalid CSV list: {spec}")
-        m = re.match(r"^\s*(-?\d+)\s*\.\.\s*(-?\d+)(?::\s*(-?\d+)\s*)?$", s)
-        if m:
-            start = int(m.group(1)); end = int(m.group(2)); step = int(m.group(3)) if m.group(3) else (1 if end >= start else -1)
-            if step == 0:
-                raise ValueError("Range step cannot be 0")
-            vals: List[int] = []
-            if step > 0:
-                i = start
-                while i <= end:
-                    vals.append(i); i += step
-            else:
-                i = start
-                while i >= end:
-                    vals.append(i); i += step
-            return vals
-        if re.match(r"^\s*-?\d+\s*$", s):
-            return [int(s)]
-        raise ValueError(f"Invalid var-values spec: {spec}")
-
     # Apply var_values overrides
     apply_scenario_var_values(scs, getattr(args, 'scenario_var_values', []))
 
-    if getattr(args, 'dry_run', False):
+    dry_run = getattr(args, 'dry_run', False)
+    if runner.numa_split and runner.auto_cpu_ids and args.receiver_host == args.client_host == "local":
+        # Fail before any run rather than silently running unsplit
+        try:
+            numa_split_cpus()
+        except ValueError as e:
+            print(f"{'Warning' if dry_run else 'Error'}: --numa-split: {e}", file=sys.stderr)
+            if not dry_run:
+                return 2
+
+    if dry_run:
         print("Planned runs:")
-        def _scenario_asdict_json(s: Scenario) -> Dict:
-            d = dc.asdict(s)
-            links = d.get("linkages") or {}
-            for k, v in list(links.items()):
-                if callable(v):
-                    name = getattr(v, "__name__", None)
-                    links[k] = f"callable:{name or repr(v)}"
-            return d
         for s in scs:
-            print(json.dumps(_scenario_asdict_json(s), indent=2))
+            print(json.dumps(_scenario_to_jsonable(s), indent=2))
         print("Runner:", json.dumps({
             "receiver_host": args.receiver_host,
             "client_host": args.client_host,
@@ -332,16 +658,25 @@ def run_from_args(args, scenarios: List[Scenario]) -> int:
         }, indent=2))
         return 0
 
-    for s in scs:
-        sc_dir = runner.run_scenario(s, args.out, cli_args=args)
-        if getattr(args, 'auto_plot', False):
-            # Per-run only plotting directly inside the scenario run directory
-            _ = _run_plot(
-                args.out,
-                s.name,
-                args.plot_relative_to,
-                impls=list(s.implementations),
-                run_dir=sc_dir,
-                no_title=getattr(args, 'plot_no_title', False),
-            )
+    plots: List[subprocess.Popen] = []
+    prev_handlers = {sig: signal.signal(sig, _exit_on_signal) for sig in (signal.SIGTERM, signal.SIGHUP)}
+    try:
+        for s in scs:
+            sc_dir = runner.run_scenario(s, args.out, cli_args=args)
+            if getattr(args, 'auto_plot', False):
+                # Per-run only plotting directly inside the scenario run directory
+                plot_args = (args.out, s.name, args.plot_relative_to)
+                plot_kwargs = dict(impls=list(s.implementations), run_dir=sc_dir,
+                                   no_title=getattr(args, 'plot_no_title', False))
+                if getattr(args, 'plot_in_background', False):
+                    # Opt-in: the plot shares CPUs and caches with the next scenario's runs
+                    plots.append(_start_plot(*plot_args, **plot_kwargs))
+                else:
+                    _run_plot(*plot_args, **plot_kwargs)
+    finally:
+        runner.close()
+        for sig, handler in prev_handlers.items():
+            signal.signal(sig, handler)
+    for proc in plots:
+        proc.wait()
     return 0
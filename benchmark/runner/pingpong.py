@@ -1,67 +1,80 @@
 from __future__ import annotations
+import itertools
+import os
 import shlex
 import subprocess
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Set
 
 from .constants import PINGPONG_BIN_NAME
 from .types import FixedParams
+from .utils import (close_log, missing_binaries, open_log, open_log_or_devnull, remote_command, ssh_control_opts,
+                    taskset_prefix, wait_for_client)
 
 
-def ensure_pingpong_binaries(receiver_app_dir: Path, impls) -> None:
+def ensure_pingpong_binaries(receiver_app_dir: Path, impls, verified: Optional[Set[Path]] = None) -> None:
     if receiver_app_dir:
-        missing = []
-        for i in impls:
-            bin_name = PINGPONG_BIN_NAME.get(i)
-            if not bin_name:
-                continue
-            path = receiver_app_dir / bin_name
-            if not path.exists():
-                missing.append(str(path))
+        verified = verified if verified is not None else set()
+        paths = (receiver_app_dir / PINGPONG_BIN_NAME[i] for i in impls if PINGPONG_BIN_NAME.get(i))
+        missing = missing_binaries(paths, verified)
         if missing:
             raise FileNotFoundError(f"Missing local pingpong binaries: {missing}. Set --app-root correctly.")
 
 
+def acceptor_log_path(results_dir: Path, impl: str) -> Path:
+    return results_dir / f"pingpong_acceptor_{impl}.stdout"
+
+
 def start_acceptor(receiver_host: str, receiver_app_dir: Path, impl: str, fixed: FixedParams, results_dir: Path,
-                   extra_impl_args: Optional[List[str]] = None) -> subprocess.Popen:
+                   extra_impl_args: Optional[List[str]] = None, affinity: Optional[Set[int]] = None,
+                   ssh_control: Optional[str] = None) -> subprocess.Popen:
     bin_name = PINGPONG_BIN_NAME[impl]
     args: List[str] = [
         "--address", fixed.address,
         "--buffer-size", str(fixed.buffer_size),
     ]
     if fixed.pp_acceptor_cpu is not None:
-        args += ["--cpu-id", str(int(fixed.pp_acceptor_cpu))]
+        args.extend(("--cpu-id", str(int(fixed.pp_acceptor_cpu))))
     if impl in ('uring_sqpoll', 'uring_sqpoll_zc'):
         # SQPOLL variant: allow specifying kernel poller CPU
         if fixed.pp_acceptor_sqpoll_cpu is not None:
-            args += ["--sqpoll-cpu-id", str(int(fixed.pp_acceptor_sqpoll_cpu))]
+            args.extend(("--sqpoll-cpu-id", str(int(fixed.pp_acceptor_sqpoll_cpu))))
         if impl == 'uring_sqpoll_zc':
-            args += ["--zerocopy"]
+            args.append("--zerocopy")
     elif impl == 'uring':
         # Baseline uring: disable SQPOLL explicitly
-        args += ["--no-sqpoll"]
+        args.append("--no-sqpoll")
     # Socket buffers
     if fixed.so_rcvbuf_size:
-        args += ["--so-rcvbuf", str(fixed.so_rcvbuf_size)]
+        args.extend(("--so-rcvbuf", str(fixed.so_rcvbuf_size)))
     if fixed.so_sndbuf_size:
-        args += ["--so-sndbuf", str(fixed.so_sndbuf_size)]
+        args.extend(("--so-sndbuf", str(fixed.so_sndbuf_size)))
 
-    log = (results_dir / f"pingpong_acceptor_{impl}.stdout").open("w")
+    log = open_log(acceptor_log_path(results_dir, impl))
     cmd = (results_dir / f"pingpong_acceptor_{impl}.cmd")
-    if receiver_host == "local":
-        full_cmd = [str(receiver_app_dir / bin_name)] + args + list(extra_impl_args or [])
-        cmd.write_text(" ".join(shlex.quote(c) for c in full_cmd))
-        return subprocess.Popen(full_cmd, stdout=log, stderr=subprocess.STDOUT, cwd=str(receiver_app_dir))
-    else:
-        remote_cmd = f"cd {shlex.quote(str(receiver_app_dir))} && ./" + shlex.quote(bin_name)
-        remote_cmd += " " + " ".join(shlex.quote(a) for a in (args + list(extra_impl_args or [])))
-        full_cmd = ["ssh", receiver_host, remote_cmd]
-        cmd.write_text(" ".join(shlex.quote(c) for c in full_cmd))
-        return subprocess.Popen(full_cmd, stdout=log, stderr=subprocess.STDOUT)
+    try:
+        if receiver_host == "local":
+            full_cmd = [str(receiver_app_dir / bin_name), *args, *(extra_impl_args or ())]
+            if affinity:
+                full_cmd = [*taskset_prefix(affinity), *full_cmd]
+            cmd.write_text(shlex.join(full_cmd))
+            return subprocess.Popen(full_cmd, stdout=log, stderr=subprocess.STDOUT, cwd=str(receiver_app_dir),
+                                    start_new_session=True)
+        else:
+            remote_cmd = remote_command(receiver_app_dir, bin_name, [*args, *(extra_impl_args or ())])
+            full_cmd = ["ssh", receiver_host, remote_cmd]
+            # The control socket only lives as long as the runner; keep it out of the recorded command
+            cmd.write_text(shlex.join(full_cmd))
+            full_cmd[1:1] = ssh_control_opts(ssh_control)
+            return subprocess.Popen(full_cmd, stdout=log, stderr=subprocess.STDOUT, start_new_session=True)
+    finally:
+        os.close(log)
 
 
 def run_initiator(client_host: str, client_app_dir: Path, impl: str, fixed: FixedParams, results_dir: Path,
-                  tags: Dict[str, str], extra_impl_args: Optional[List[str]] = None) -> int:
+                  tags: Dict[str, str], extra_impl_args: Optional[List[str]] = None,
+                  discard_output: bool = False, server: Optional[subprocess.Popen] = None,
+                  affinity: Optional[Set[int]] = None, ssh_control: Optional[str] = None) -> int:
     bin_name = PINGPONG_BIN_NAME[impl]
     args: List[str] = [
         "--initiator",
@@ -75,35 +88,42 @@ def run_initiator(client_host: str, client_app_dir: Path, impl: str, fixed: Fixe
         "--results-dir", str(results_dir),
     ]
     if fixed.pp_initiator_cpu is not None:
-        args += ["--cpu-id", str(int(fixed.pp_initiator_cpu))]
+        args.extend(("--cpu-id", str(int(fixed.pp_initiator_cpu))))
     if impl in ('uring_sqpoll', 'uring_sqpoll_zc'):
         # SQPOLL variant: allow specifying kernel poller CPU
         if fixed.pp_initiator_sqpoll_cpu is not None:
-            args += ["--sqpoll-cpu-id", str(int(fixed.pp_initiator_sqpoll_cpu))]
+            args.extend(("--sqpoll-cpu-id", str(int(fixed.pp_initiator_sqpoll_cpu))))
         if impl == 'uring_sqpoll_zc':
-            args += ["--zerocopy"]
+            args.append("--zerocopy")
     elif impl == 'uring':
         # Baseline uring: disable SQPOLL explicitly
-        args += ["--no-sqpoll"]
+        args.append("--no-sqpoll")
     # Socket buffers
     if getattr(fixed, 'so_rcvbuf_size', None):
-        args += ["--so-rcvbuf", str(fixed.so_rcvbuf_size)]
+        args.extend(("--so-rcvbuf", str(fixed.so_rcvbuf_size)))
     if getattr(fixed, 'so_sndbuf_size', None):
-        args += ["--so-sndbuf", str(fixed.so_sndbuf_size)]
+        args.extend(("--so-sndbuf", str(fixed.so_sndbuf_size)))
     if impl == 'uring_zc':
-        args += ["--no-sqpoll", "--zerocopy"]
-    for k, v in tags.items():
-        args += ["--tag", f"{k}={v}"]
+        args.extend(("--no-sqpoll", "--zerocopy"))
+    args.extend(itertools.chain.from_iterable(("--tag", f"{k}={v}") for k, v in tags.items()))
 
-    log = (results_dir / f"pingpong_initiator_{impl}.stdout").open("w")
+    log = open_log_or_devnull(results_dir / f"pingpong_initiator_{impl}.stdout", discard_output)
     cmd = (results_dir / f"pingpong_initiator_{impl}.cmd")
-    if client_host == "local":
-        full_cmd = [str(client_app_dir / bin_name)] + args + list(extra_impl_args or [])
-        cmd.write_text(" ".join(shlex.quote(c) for c in full_cmd))
-        return subprocess.call(full_cmd, stdout=log, stderr=subprocess.STDOUT, cwd=str(client_app_dir))
-    else:
-        remote_cmd = f"cd {shlex.quote(str(client_app_dir))} && ./" + shlex.quote(bin_name)
-        remote_cmd += " " + " ".join(shlex.quote(a) for a in (args + list(extra_impl_args or [])))
-        full_cmd = ["ssh", client_host, remote_cmd]
-        cmd.write_text(" ".join(shlex.quote(c) for c in full_cmd))
-        return subprocess.call(full_cmd, stdout=log, stderr=subprocess.STDOUT)
+    try:
+        if client_host == "local":
+            full_cmd = [str(client_app_dir / bin_name), *args, *(extra_impl_args or ())]
+            if affinity:
+                full_cmd = [*taskset_prefix(affinity), *full_cmd]
+            cmd.write_text(shlex.join(full_cmd))
+            proc = subprocess.Popen(full_cmd, stdout=log, stderr=subprocess.STDOUT, cwd=str(client_app_dir),
+                                    start_new_session=True)
+        else:
+            remote_cmd = remote_command(client_app_dir, bin_name, [*args, *(extra_impl_args or ())])
+            full_cmd = ["ssh", client_host, remote_cmd]
+            # The control socket only lives as long as the runner; keep it out of the recorded command
+            cmd.write_text(shlex.join(full_cmd))
+            full_cmd[1:1] = ssh_control_opts(ssh_control)
+            proc = subprocess.Popen(full_cmd, stdout=log, stderr=subprocess.STDOUT, start_new_session=True)
+    finally:
+        close_log(log)
+    return wait_for_client(proc, server)
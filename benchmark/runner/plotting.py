@@ -1,18 +1,19 @@
 from __future__ import annotations
 import shlex
 import subprocess
+import sys
 from pathlib import Path
 from typing import List, Optional
 
 
+_PLOT_SCRIPT = Path(__file__).resolve().parents[1] / "plot_results.py"
+
+
 def run_plot(results_root: Path, scenario_name: str, relative_to: str,
              impls: Optional[List[str]] = None, run_dir: Optional[Path] = None,
              no_title: bool = False) -> int:
-    from pathlib import Path as _Path
-    import sys as _sys
-    plot_script = _Path(__file__).resolve().parents[1] / "plot_results.py"
     cmd = [
-        _sys.executable, str(plot_script),
+        sys.executable, str(_PLOT_SCRIPT),
         "--results-dir", str(results_root),
         "--scenario", scenario_name,
         "--relative-to", relative_to,
@@ -24,5 +25,5 @@ def run_plot(results_root: Path, scenario_name: str, relative_to: str,
         cmd += ["--run-dir", str(run_dir)]
     if no_title:
         cmd += ["--no-title"]
-    print(f"Auto-plot: {' '.join(shlex.quote(c) for c in cmd)}")
-    return subprocess.call(cmd)
+    print(f"Auto-plot: {shlex.join(cmd)}")
+    return subprocess.run(cmd).returncode
@@ -1,28 +1,34 @@
 from __future__ import annotations
+import itertools
+import os
 import shlex
 import subprocess
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Set
 
 from .constants import RECEIVER_BIN_NAME, CLIENT_BIN_NAME
 from .types import FixedParams
+from .utils import (close_log, missing_binaries, numactl_prefix, open_log, open_log_or_devnull, remote_command,
+                    ssh_control_opts, taskset_prefix, wait_for_client)
  
 
 
-def ensure_receiver_binaries(receiver_app_dir: Path, impls, bin_map: Dict[str, str] = RECEIVER_BIN_NAME) -> None:
+def ensure_receiver_binaries(receiver_app_dir: Path, impls, bin_map: Dict[str, str] = RECEIVER_BIN_NAME,
+                             verified: Optional[Set[Path]] = None) -> None:
     if receiver_app_dir:
-        missing = []
-        for i in impls:
-            path = receiver_app_dir / bin_map[i]
-            if not path.exists():
-                missing.append(str(path))
+        verified = verified if verified is not None else set()
+        missing = missing_binaries((receiver_app_dir / bin_map[i] for i in impls), verified)
         if missing:
             raise FileNotFoundError(f"Missing local receiver binaries: {missing}. Set --app-root correctly.")
 
 
-def start_receiver(receiver_host: str, receiver_app_dir: Path, impl: str, fixed: FixedParams, results_dir: Path,
-                   extra_tags: Dict[str, str], extra_impl_args: List[str]) -> subprocess.Popen:
-    bin_name = RECEIVER_BIN_NAME[impl]
+def receiver_log_path(results_dir: Path, impl: str) -> Path:
+    return results_dir / f"receiver_{impl}.stdout"
+
+
+def build_receiver_args(impl: str, fixed: FixedParams, results_dir: Path, extra_tags: Dict[str, str],
+                        extra_impl_args: List[str]) -> List[str]:
+    """Receiver argv (without the binary) for one run."""
     args: List[str] = [
         "--address", fixed.address,
         "--buffer-size", str(fixed.buffer_size),
@@ -33,57 +39,80 @@ def start_receiver(receiver_host: str, receiver_app_dir: Path, impl: str, fixed:
         "--shutdown-on-disconnect",
     ]
     if fixed.busy_spin:
-        args += ["--busy-spin", "true"]
+        args.extend(("--busy-spin", "true"))
 
     if fixed.so_rcvbuf_size:
-        args += ["--so-rcvbuf", str(fixed.so_rcvbuf_size)]
+        args.extend(("--so-rcvbuf", str(fixed.so_rcvbuf_size)))
     if fixed.so_sndbuf_size:
-        args += ["--so-sndbuf", str(fixed.so_sndbuf_size)]
+        args.extend(("--so-sndbuf", str(fixed.so_sndbuf_size)))
     if fixed.echo != "none":
-        args += ["--echo", fixed.echo]
+        args.extend(("--echo", fixed.echo))
     if fixed.simulated_workload_delay_microsecs:
-        args += ["--simulated-workload-delay-nanos", str(int(fixed.simulated_workload_delay_microsecs * 1000))]
+        args.extend(("--simulated-workload-delay-nanos", str(int(fixed.simulated_workload_delay_microsecs * 1000))))
 
     if impl == "bsd":
         if fixed.bsd_read_limit > 0:
-            args += ["--read-limit", str(fixed.bsd_read_limit)]
+            args.extend(("--read-limit", str(fixed.bsd_read_limit)))
     elif impl == "uring":
         if fixed.uring_buffer_count > 0:
-            args += ["--buffer-count", str(fixed.uring_buffer_count)]
+            args.extend(("--buffer-count", str(fixed.uring_buffer_count)))
         if fixed.uring_per_conn_buffer_pool:
-            args += ["--per-connection-buffer-pool"]
+            args.append("--per-connection-buffer-pool")
         if fixed.uring_zerocopy:
-            args += ["--zerocopy"]
+            args.append("--zerocopy")
         # Optional ring sizes
         if fixed.uring_sq_entries > 0:
-            args += ["--sq-entries", str(int(fixed.uring_sq_entries))]
+            args.extend(("--sq-entries", str(int(fixed.uring_sq_entries))))
         if fixed.uring_cq_entries > 0:
-            args += ["--cq-entries", str(int(fixed.uring_cq_entries))]
+            args.extend(("--cq-entries", str(int(fixed.uring_cq_entries))))
 
     # CPU affinity for receiver workers: use FixedParams only
     if fixed.worker_cpus:
-        args += ["--worker-cpu-ids", str(fixed.worker_cpus)]
-    for k, v in extra_tags.items():
-        args += ["--tag", f"{k}={v}"]
+        args.extend(("--worker-cpu-ids", str(fixed.worker_cpus)))
+    args.extend(itertools.chain.from_iterable(("--tag", f"{k}={v}") for k, v in extra_tags.items()))
     # Pass extra impl args through as-is
-    args += list(extra_impl_args or [])
+    args.extend(extra_impl_args or ())
+    return args
 
-    log = (results_dir / f"receiver_{impl}.stdout").open("w")
+
+def start_receiver(receiver_host: str, receiver_app_dir: Path, impl: str, fixed: FixedParams, results_dir: Path,
+                   extra_tags: Dict[str, str], extra_impl_args: List[str],
+                   numa_node: Optional[int] = None, affinity: Optional[Set[int]] = None,
+                   ssh_control: Optional[str] = None) -> subprocess.Popen:
+    bin_name = RECEIVER_BIN_NAME[impl]
+    args = build_receiver_args(impl, fixed, results_dir, extra_tags, extra_impl_args)
+    log = open_log(receiver_log_path(results_dir, impl))
     cmd = (results_dir / f"receiver_{impl}.cmd")
-    if receiver_host == "local":
-        full_cmd = [str(receiver_app_dir / bin_name)] + args
-        cmd.write_text(" ".join(shlex.quote(c) for c in full_cmd))
-        return subprocess.Popen(full_cmd, stdout=log, stderr=subprocess.STDOUT, cwd=str(receiver_app_dir))
-    else:
-        remote_cmd = f"cd {shlex.quote(str(receiver_app_dir))} && ./" + shlex.quote(bin_name)
-        remote_cmd += " " + " ".join(shlex.quote(a) for a in args)
-        full_cmd = ["ssh", receiver_host, remote_cmd]
-        cmd.write_text(" ".join(shlex.quote(c) for c in full_cmd))
-        return subprocess.Popen(full_cmd, stdout=log, stderr=subprocess.STDOUT)
+    try:
+        if receiver_host == "local":
+            # argv goes straight to exec; no quoting needed on the local path
+            full_cmd = [str(receiver_app_dir / bin_name), *args]
+            if numa_node is not None:
+                # Keep the receiver's memory on the node that owns its worker CPUs
+                full_cmd = [*numactl_prefix(numa_node, affinity), *full_cmd]
+            elif affinity:
+                full_cmd = [*taskset_prefix(affinity), *full_cmd]
+            cmd.write_text(shlex.join(full_cmd))
+            # Own session: a terminal Ctrl-C reaches the runner only, which then kills the receiver.
+            # Spawning stays on CPython's vfork path (no preexec_fn/user/group/umask), so the
+            # runner's page tables are not copied; the posix_spawn path would additionally need
+            # close_fds=False and no cwd/session, which we don't want.
+            return subprocess.Popen(full_cmd, stdout=log, stderr=subprocess.STDOUT, cwd=str(receiver_app_dir),
+                                    start_new_session=True)
+        else:
+            remote_cmd = remote_command(receiver_app_dir, bin_name, args)
+            full_cmd = ["ssh", receiver_host, remote_cmd]
+            # The control socket only lives as long as the runner; keep it out of the recorded command
+            cmd.write_text(shlex.join(full_cmd))
+            full_cmd[1:1] = ssh_control_opts(ssh_control)
+            return subprocess.Popen(full_cmd, stdout=log, stderr=subprocess.STDOUT, start_new_session=True)
+    finally:
+        # The child has its own copy of the fd by now
+        os.close(log)
 
 
-def run_client(client_host: str, client_app_dir: Path, fixed: FixedParams, duration_sec: int, results_dir: Path,
-               client_extra_args: List[str]) -> int:
+def build_client_args(fixed: FixedParams, duration_sec: int) -> List[str]:
+    """Client argv (without the binary and any user-supplied extra args) for one run."""
     args: List[str] = [
         "--address", fixed.address,
         "--senders", str(fixed.senders),
@@ -95,28 +124,46 @@ def run_client(client_host: str, client_app_dir: Path, fixed: FixedParams, durat
         "--metric-hud-interval-secs", str(fixed.metric_hud_interval_secs),
     ]
     if fixed.drain:
-        args += ["--drain"]
+        args.append("--drain")
     if fixed.nodelay:
-        args += ["--nodelay"]
+        args.append("--nodelay")
     if fixed.so_rcvbuf_size:
-        args += ["--so-rcvbuf", str(fixed.so_rcvbuf_size)]
+        args.extend(("--so-rcvbuf", str(fixed.so_rcvbuf_size)))
     if fixed.so_sndbuf_size:
-        args += ["--so-sndbuf", str(fixed.so_sndbuf_size)]
+        args.extend(("--so-sndbuf", str(fixed.so_sndbuf_size)))
     # Sender CPUs: use FixedParams only
     if fixed.sender_cpus:
-        args += ["--sender-cpu-ids", str(fixed.sender_cpus)]
-    log = (results_dir / f"{CLIENT_BIN_NAME}.stdout").open("w")
+        args.extend(("--sender-cpu-ids", str(fixed.sender_cpus)))
+    return args
+
+
+def run_client(client_host: str, client_app_dir: Path, fixed: FixedParams, duration_sec: int, results_dir: Path,
+               client_extra_args: List[str], discard_output: bool = False,
+               numa_node: Optional[int] = None, server: Optional[subprocess.Popen] = None,
+               affinity: Optional[Set[int]] = None, ssh_control: Optional[str] = None) -> int:
+    args = build_client_args(fixed, duration_sec)
+    log = open_log_or_devnull(results_dir / f"{CLIENT_BIN_NAME}.stdout", discard_output)
     cmd = (results_dir / f"{CLIENT_BIN_NAME}.cmd")
-    if client_host == "local":
-        full_cmd = [str(client_app_dir / CLIENT_BIN_NAME)] + args + list(client_extra_args or [])
-        cmd.write_text(" ".join(shlex.quote(c) for c in full_cmd))
-        return subprocess.call(full_cmd, stdout=log, stderr=subprocess.STDOUT, cwd=str(client_app_dir))
-    else:
-        remote_cmd = f"cd {shlex.quote(str(client_app_dir))} && ./" + shlex.quote(CLIENT_BIN_NAME)
-        remote_cmd += " " + " ".join(shlex.quote(a) for a in (args + list(client_extra_args or [])))
-        full_cmd = ["ssh", client_host, remote_cmd]
-        cmd.write_text(" ".join(shlex.quote(c) for c in full_cmd))
-        return subprocess.call(full_cmd, stdout=log, stderr=subprocess.STDOUT)
+    try:
+        if client_host == "local":
+            full_cmd = [str(client_app_dir / CLIENT_BIN_NAME), *args, *(client_extra_args or ())]
+            if numa_node is not None:
+                full_cmd = [*numactl_prefix(numa_node, affinity), *full_cmd]
+            elif affinity:
+                full_cmd = [*taskset_prefix(affinity), *full_cmd]
+            cmd.write_text(shlex.join(full_cmd))
+            proc = subprocess.Popen(full_cmd, stdout=log, stderr=subprocess.STDOUT, cwd=str(client_app_dir),
+                                    start_new_session=True)
+        else:
+            remote_cmd = remote_command(client_app_dir, CLIENT_BIN_NAME, [*args, *(client_extra_args or ())])
+            full_cmd = ["ssh", client_host, remote_cmd]
+            # The control socket only lives as long as the runner; keep it out of the recorded command
+            cmd.write_text(shlex.join(full_cmd))
+            full_cmd[1:1] = ssh_control_opts(ssh_control)
+            proc = subprocess.Popen(full_cmd, stdout=log, stderr=subprocess.STDOUT, start_new_session=True)
+    finally:
+        close_log(log)
+    return wait_for_client(proc, server)
 
 
 def stop_receiver(proc: subprocess.Popen, timeout: float = 30.0):
@@ -1,9 +1,11 @@
 from __future__ import annotations
 import dataclasses as dc
+import operator
 from typing import Any, Callable, Dict, List, Optional, Sequence
 
 
-@dc.dataclass
+# eq/repr off: instances are never compared, and the generated repr lists all ~30 fields
+@dc.dataclass(slots=True, eq=False, repr=False)
 class FixedParams:
     address: str = "0.0.0.0:19004"
     so_rcvbuf_size: str = None
@@ -50,6 +52,29 @@ class FixedParams:
     uring_sq_entries: int = 0
     uring_cq_entries: int = -1
 
+    def __copy__(self) -> FixedParams:
+        # Slotted instances have no __dict__ to duplicate, so the generic copy.copy goes
+        # through __reduce_ex__; rebuilding from the field values is several times faster.
+        return type(self)(*_fixed_values(self))
+
+    def __repr__(self) -> str:
+        # Only the fields that differ from the defaults
+        changed = ", ".join(f"{name}={value!r}" for name, value, default
+                            in zip(_FIXED_FIELD_NAMES, _fixed_values(self), _FIXED_DEFAULTS)
+                            if value != default)
+        return f"{type(self).__name__}({changed})"
+
+
+_FIXED_FIELD_NAMES = tuple(f.name for f in dc.fields(FixedParams))
+# All FixedParams field values in declaration (= __init__ parameter) order
+_fixed_values = operator.attrgetter(*_FIXED_FIELD_NAMES)
+_FIXED_DEFAULTS = _fixed_values(FixedParams())
+
+
+def fixed_params_dict(fixed: FixedParams) -> Dict[str, Any]:
+    """Field name -> value for every FixedParams field: a shallow dc.asdict from one attrgetter call."""
+    return dict(zip(_FIXED_FIELD_NAMES, _fixed_values(fixed)))
+
 # A linkage function can compute a dependent field given the current fixed params,
 # the varying field name, and its value.
 """A linkage function computes a dependent field.
@@ -59,7 +84,8 @@ Signature (only):
 """
 LinkFunc = Callable[["FixedParams"], Any]
 
-@dc.dataclass
+# No generated repr: it would recursively format fixed and the linkage callables
+@dc.dataclass(slots=True, repr=False)
 class Scenario:
     name: str
     # Optional: friendly title used in plots; if absent, fall back to 'name'
@@ -78,3 +104,13 @@ class Scenario:
     # Value must be a Python function with signature:
     #   fn(fixed: FixedParams) -> Any
     linkages: Dict[str, LinkFunc] = dc.field(default_factory=dict)
+
+    def __post_init__(self) -> None:
+        # Validate linkages once here instead of on every evaluation in the runner
+        for target, fn in self.linkages.items():
+            if not hasattr(self.fixed, target):
+                raise AttributeError(f"FixedParams has no field '{target}' (from linkage)")
+            # Only single-argument callables are supported: fn(fixed) -> Any
+            if not callable(fn):
+                raise TypeError(
+                    f"Unsupported linkage type for '{target}': expected callable, got {type(fn).__name__}")
@@ -1,76 +1,236 @@
 from __future__ import annotations
-from typing import Iterable, List, Optional
+from typing import Dict, Iterable, List, Optional, Sequence, Set
+import math
+import os
 import re
 import shlex
 import subprocess
+import sys
+import time
 from pathlib import Path
 
 def has_flag_or_kv(tokens: Iterable[str], name: str) -> bool:
     """Return True if name (flag) or name= (kv) appears in the token list."""
     name_eq = name + "="
-    for tok in tokens or []:
-        if tok == name or tok.startswith(name_eq):
-            return True
-    return False
+    return any(tok == name or tok.startswith(name_eq) for tok in tokens or ())
+
+
+def missing_binaries(paths: Iterable[Path], verified: Set[Path]) -> List[str]:
+    """Return the paths that don't exist; ones found are added to 'verified' and not checked again.
+
+    Unverified paths are looked up in one directory scan per parent instead of a stat each.
+    """
+    missing: List[str] = []
+    present: Dict[Path, Set[str]] = {}
+    for path in paths:
+        if path in verified:
+            continue
+        names = present.get(path.parent)
+        if names is None:
+            try:
+                with os.scandir(path.parent) as it:
+                    # is_file() uses the dirent type; only symlinks cost a stat
+                    names = {e.name for e in it if e.is_file()}
+            except OSError:
+                names = set()
+            present[path.parent] = names
+        if path.name in names:
+            verified.add(path)
+        else:
+            missing.append(str(path))
+    return missing
+
+
+def open_log(path: Path) -> int:
+    """Open a subprocess log as a raw fd (no Python buffering); close it once the child is spawned."""
+    return os.open(str(path), os.O_WRONLY | os.O_CREAT | os.O_TRUNC | os.O_CLOEXEC, 0o644)
+
+
+def open_log_or_devnull(path: Path, discard: bool) -> int:
+    """Like open_log, but returns subprocess.DEVNULL when output is to be discarded."""
+    return subprocess.DEVNULL if discard else open_log(path)
+
+
+def close_log(log: int) -> None:
+    if log != subprocess.DEVNULL:
+        os.close(log)
+
+
+def numactl_prefix(node: int, cpus: Optional[Iterable[int]] = None) -> List[str]:
+    """numactl argv binding memory to node, and CPUs to 'cpus' (or to the whole node when not given)."""
+    cpu_bind = f"--physcpubind={','.join(str(c) for c in sorted(cpus))}" if cpus else f"--cpunodebind={node}"
+    return ["numactl", cpu_bind, f"--membind={node}"]
+
+
+def taskset_prefix(cpus: Iterable[int]) -> List[str]:
+    """taskset argv that sets the CPU mask before exec, so every thread of the child inherits it.
+
+    Threads the binary pins itself narrow this mask afterwards and are never widened again.
+    """
+    return ["taskset", "-c", ",".join(str(c) for c in sorted(cpus))]
+
+
+def remote_command(app_dir: Path, bin_name: str, args: Sequence[str]) -> str:
+    """Command line for ssh that runs ./bin_name in app_dir on the remote host.
+
+    sshd always hands the command to the login shell, so arguments must be quoted; exec
+    then replaces that shell with the binary, so signals and the exit status are its own.
+    """
+    return f"cd {shlex.quote(str(app_dir))} && exec ./{shlex.quote(bin_name)} {shlex.join(args)}"
+
+
+def ssh_control_opts(control_path: Optional[str]) -> List[str]:
+    """ssh options that route a connection through the master at control_path (none without one)."""
+    return ["-o", f"ControlPath={control_path}"] if control_path else []
+
+
+def start_ssh_master(host: str, control_path: str) -> bool:
+    """Open a background ControlMaster connection to host that later ssh calls multiplex over.
+
+    Returns False (after a warning) if it could not be set up; ssh then connects per call as before.
+    """
+    cmd = ["ssh", "-M", "-N", "-f", *ssh_control_opts(control_path),
+           "-o", "ControlPersist=600", "-o", "ServerAliveInterval=30", host]
+    try:
+        # -f: ssh backgrounds itself once authenticated, so this returns when the master is up
+        rc = subprocess.run(cmd, stdin=subprocess.DEVNULL).returncode
+    except OSError as e:
+        print(f"Could not start ssh master for {host}: {e}", file=sys.stderr)
+        return False
+    if rc != 0:
+        print(f"Could not start ssh master for {host} (exit {rc}); using one connection per run",
+              file=sys.stderr)
+        return False
+    return True
+
+
+def stop_ssh_master(host: str, control_path: str) -> None:
+    subprocess.run(["ssh", "-O", "exit", *ssh_control_opts(control_path), host],
+                   stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def wait_for_client(proc: subprocess.Popen, server: Optional[subprocess.Popen] = None,
+                    poll_interval: float = 0.5, grace: float = 2.0) -> int:
+    """Wait for a client process, watching the server it talks to.
+
+    If the server exits first, the client gets 'grace' seconds to finish on its own (a
+    receiver normally exits right after the client disconnects) and is then terminated, so
+    a crashed server doesn't hold the run for the rest of its duration. The client is
+    killed if the wait itself is interrupted.
+    """
+    try:
+        while True:
+            try:
+                return proc.wait(timeout=poll_interval)
+            except subprocess.TimeoutExpired:
+                pass
+            if server is not None and server.poll() is not None:
+                try:
+                    return proc.wait(timeout=grace)
+                except subprocess.TimeoutExpired:
+                    print(f"Server exited with {server.returncode} while the client was still running; "
+                          f"stopping client {proc.pid}", file=sys.stderr)
+                    proc.terminate()
+                    try:
+                        return proc.wait(timeout=5.0)
+                    except subprocess.TimeoutExpired:
+                        proc.kill()
+                        return proc.wait()
+    except BaseException:
+        proc.kill()
+        proc.wait()
+        raise
+
+
+def wait_for_log_marker(path: Path, marker: bytes, timeout: float,
+                        interval: float = 0.001, max_interval: float = 0.05,
+                        proc: Optional[subprocess.Popen] = None) -> bool:
+    """Poll a subprocess log until it contains marker; False if it hasn't shown up within timeout.
+
+    The poll interval starts small and doubles up to max_interval, so a fast server is
+    noticed within a millisecond or two while a slow one costs only a few reads. When
+    proc is given, also gives up as soon as it exits without having logged the marker.
+    """
+    deadline = time.monotonic() + timeout
+    with open(path, "rb") as f:
+        tail = b""
+        while True:
+            # Checked before the read so output written just before exit is still seen
+            exited = proc is not None and proc.poll() is not None
+            chunk = f.read()
+            if chunk:
+                # Keep a short tail so a marker split across two reads is still found
+                tail = tail[-len(marker):] + chunk
+                if marker in tail:
+                    return True
+            if exited:
+                return False
+            now = time.monotonic()
+            if now >= deadline:
+                return False
+            time.sleep(min(interval, deadline - now))
+            interval = min(interval * 2, max_interval)
 
 
 # --- Scenario var_values parsing ---
 
+_RANGE_RE = re.compile(r"^\s*(-?\d+)\s*\.\.\s*(-?\d+)(?::\s*(-?\d+)\s*)?$")
+
+
 def parse_number_list_spec(spec: str) -> List[float]:
     s = spec.strip()
     if not s:
         return []
     if "," in s:
         try:
-            return [float(x.strip()) for x in s.split(",") if x.strip()]
+            return [float(x) for x in map(str.strip, s.split(",")) if x]
         except Exception:
             raise ValueError(f"Invalid CSV list: {spec}")
-    m = re.match(r"^\s*(-?\d+)\s*\.\.\s*(-?\d+)(?::\s*(-?\d+)\s*)?$", s)
+    # A single number is the common case; only the a..b[:step] form needs the regex
+    try:
+        v = float(s)
+    except ValueError:
+        pass
+    else:
+        if math.isfinite(v):
+            return [v]
+    m = _RANGE_RE.match(s)
     if m:
         start = int(m.group(1))
         end = int(m.group(2))
         step = int(m.group(3)) if m.group(3) else (1 if end >= start else -1)
         if step == 0:
             raise ValueError("Range step cannot be 0")
-        vals: List[int] = []
-        if step > 0:
-            i = start
-            while i <= end:
-                vals.append(i)
-                i += step
-        else:
-            i = start
-            while i >= end:
-                vals.append(i)
-                i += step
-        return [float(v) for v in vals]
-    if re.match(r"^\s*-?\d+(?:\.\d+)?\s*$", s):
-        return [float(s)]
+        # Inclusive end: extend the stop by one in the direction of travel
+        return list(map(float, range(start, end + (1 if step > 0 else -1), step)))
     raise ValueError(f"Invalid var-values spec: {spec}")
 
 
 def apply_scenario_var_values(scenarios, items):
+    # Items may name scenarios filtered out by --scenario; those are skipped quietly
+    by_name = {sc.name: sc for sc in scenarios}
     for item in items or []:
-        if ":" not in item:
+        scen, sep, spec = item.partition(":")
+        sc = by_name.get(scen) if sep else None
+        if sc is None:
             continue
-        scen, spec = item.split(":", 1)
         try:
-            vals = parse_number_list_spec(spec)
+            sc.var_values = tuple(parse_number_list_spec(spec))
         except Exception:
             continue
-        for sc in scenarios:
-            if sc.name == scen:
-                sc.var_values = list(vals)
 
 
 # --- Plotting helper ---
 
-def run_plot(results_root: Path, scenario_name: str, relative_to: str,
-             impls: Optional[List[str]] = None, run_dir: Optional[Path] = None,
-             no_title: bool = False) -> int:
-    plot_script = Path(__file__).resolve().parents[1] / "plot_results.py"
+_PLOT_SCRIPT = Path(__file__).resolve().parents[1] / "plot_results.py"
+
+
+def _plot_command(results_root: Path, scenario_name: str, relative_to: str,
+                  impls: Optional[List[str]] = None, run_dir: Optional[Path] = None,
+                  no_title: bool = False) -> List[str]:
+    # Same interpreter (and venv) as the runner rather than whatever python3 is on PATH
     cmd = [
-        "python3", str(plot_script),
+        sys.executable, str(_PLOT_SCRIPT),
         "--results-dir", str(results_root),
         "--scenario", scenario_name,
         "--relative-to", relative_to,
@@ -82,5 +242,28 @@ def run_plot(results_root: Path, scenario_name: str, relative_to: str,
         cmd += ["--run-dir", str(run_dir)]
     if no_title:
         cmd += ["--no-title"]
-    print(f"Auto-plot: {' '.join(shlex.quote(c) for c in cmd)}")
-    return subprocess.call(cmd)
+    print(f"Auto-plot: {shlex.join(cmd)}")
+    return cmd
+
+
+def run_plot(results_root: Path, scenario_name: str, relative_to: str,
+             impls: Optional[List[str]] = None, run_dir: Optional[Path] = None,
+             no_title: bool = False) -> int:
+    # No preexec_fn, so CPython spawns through vfork and never copies the runner's page tables
+    return subprocess.run(_plot_command(results_root, scenario_name, relative_to, impls, run_dir, no_title)).returncode
+
+
+def start_plot(results_root: Path, scenario_name: str, relative_to: str,
+               impls: Optional[List[str]] = None, run_dir: Optional[Path] = None,
+               no_title: bool = False) -> subprocess.Popen:
+    """Like run_plot, but returns the running plot process instead of waiting for it.
+
+    The plot overlaps the next scenario's runs, so it is dropped to the lowest CPU
+    priority; it still shares CPUs and caches with them, hence opt-in.
+    """
+    proc = subprocess.Popen(_plot_command(results_root, scenario_name, relative_to, impls, run_dir, no_title))
+    try:
+        os.setpriority(os.PRIO_PROCESS, proc.pid, 19)
+    except (AttributeError, OSError) as e:
+        print(f"Could not lower plot priority: {e}", file=sys.stderr)
+    return proc